@@ -0,0 +1,23 @@
+import os
+
+from api.backends.base import QueryBackend
+
+BACKENDS = ("postgres", "duckdb")
+
+
+def get_backend(name: str | None = None) -> QueryBackend:
+    """
+    Build the query backend selected by API_BACKEND (default: postgres).
+    - postgres: dbt marts in Postgres (api/backends/postgres.py)
+    - duckdb:   embedded DuckDB over the raw lake, no server needed (api/backends/duckdb_lake.py)
+    """
+    name = (name or os.getenv("API_BACKEND", "postgres")).strip().lower()
+
+    if name == "postgres":
+        from api.backends.postgres import PostgresBackend
+        return PostgresBackend()
+    if name == "duckdb":
+        from api.backends.duckdb_lake import DuckDBBackend
+        return DuckDBBackend()
+
+    raise ValueError(f"Unknown API_BACKEND: {name} (expected one of {', '.join(BACKENDS)})")
@@ -0,0 +1,56 @@
+from abc import ABC, abstractmethod
+from datetime import date
+
+
+def date_key(d: date | None) -> int | None:
+    """dim_dates.date_key (YYYYMMDD) for a date filter."""
+    return d.year * 10000 + d.month * 100 + d.day if d is not None else None
+
+
+class QueryBackend(ABC):
+    """
+    Query engine behind the API endpoints.
+
+    Each method returns plain row tuples in the column order the endpoint maps
+    into its response model, so every backend serves identical response schemas.
+    Report methods also return a freshness timestamp (ISO string or None when
+    the rows were computed live).
+    """
+
+    name: str = "base"
+
+    def startup(self):
+        """Open connections / warm caches. Called once on API startup."""
+
+    def shutdown(self):
+        """Release resources. Called once on API shutdown."""
+
+    @abstractmethod
+    def top_products(
+        self,
+        limit: int,
+        channel_name: str | None = None,
+        date_from: date | None = None,
+        date_to: date | None = None,
+    ) -> tuple[list[tuple], str | None]:
+        """Rows: (term, mentions, category). Optional channel / inclusive date range filters."""
+
+    @abstractmethod
+    def channel_activity(self, channel_name: str) -> list[tuple]:
+        """Rows: (date 'YYYY-MM-DD', posts, avg_views)."""
+
+    @abstractmethod
+    def search_messages(self, pattern: str, limit: int, collapse_duplicates: bool = False) -> list[tuple]:
+        """
+        Rows: (message_id, channel_name, message_date, views, forwards, has_image,
+        message_text, content_cluster_id). collapse_duplicates keeps only
+        fct_messages.is_canonical rows (one per near-duplicate cluster).
+        """
+
+    @abstractmethod
+    def engagement_curve(self, channel_name: str, message_id: int) -> list[tuple]:
+        """Rows: (polled_at, hours_since_post, views, forwards, views_per_hour), oldest first."""
+
+    @abstractmethod
+    def visual_content(self) -> tuple[list[tuple], str | None]:
+        """Rows: (channel_name, posts_with_images, total_posts, image_rate)."""
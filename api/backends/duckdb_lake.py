@@ -0,0 +1,631 @@
+"""
+Embedded DuckDB backend: serve the API straight from the raw lake, no Postgres needed.
+
+The JSON/Parquet lake (data/raw/telegram_messages), the engagement snapshots
+(data/raw/message_engagement) and the YOLO CSV are scanned with
+DuckDB's vectorized readers and materialized into a persisted DuckDB file
+(DUCKDB_PATH) that mirrors the dbt star schema (near-duplicate clusters and product
+mentions are computed with the same code as src/dedup_messages.py and
+src/extract_products.py), plus the two precomputed reports. The materialization is rebuilt when the lake's file fingerprint changes (checked at
+most every DUCKDB_REFRESH_SECONDS). Rebuilds run in one transaction, so readers
+keep seeing the previous snapshot until it commits.
+
+Single-process only: a DuckDB file can have one writer process at a time.
+"""
+import csv
+import hashlib
+import itertools
+import os
+import tempfile
+import threading
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+try:
+    import duckdb
+except ImportError:  # optional dependency
+    duckdb = None
+
+from api.backends.base import QueryBackend, date_key
+from src.config import PROCESSED_DATA_DIR, RAW_DATA_DIR
+from src import dedup_messages as dedup
+from src.extract_products import PRODUCT_DICTIONARY, build_automaton, find_products, load_dictionary
+from src.load_raw_to_postgres import collect_files
+from src.minhash import LSHIndex, MinHasher, normalize_text
+
+DUCKDB_PATH = os.getenv("DUCKDB_PATH", str(Path(PROCESSED_DATA_DIR) / "warehouse.duckdb"))
+DUCKDB_REFRESH_SECONDS = float(os.getenv("DUCKDB_REFRESH_SECONDS", "30"))
+YOLO_CSV = Path(PROCESSED_DATA_DIR) / "yolo" / "yolo_detections.csv"
+ENGAGEMENT_DIR = Path(RAW_DATA_DIR) / "message_engagement"
+
+JSON_COLUMNS = (
+    "{'message_id': 'BIGINT', 'channel_name': 'VARCHAR', 'message_date': 'VARCHAR', "
+    "'message_text': 'VARCHAR', 'has_media': 'BOOLEAN', 'image_path': 'VARCHAR', "
+    "'views': 'BIGINT', 'forwards': 'BIGINT'}"
+)
+
+YOLO_COLUMNS = (
+    "{'run_ts': 'VARCHAR', 'channel_name': 'VARCHAR', 'message_id': 'BIGINT', "
+    "'image_path': 'VARCHAR', 'detected_class': 'VARCHAR', 'class_id': 'INTEGER', "
+    "'confidence_score': 'DOUBLE', 'bbox_x1': 'REAL', 'bbox_y1': 'REAL', 'bbox_x2': 'REAL', "
+    "'bbox_y2': 'REAL', 'image_category': 'VARCHAR'}"
+)
+
+# Same transformations as the dbt project (medical_warehouse/models), in DuckDB SQL.
+# Near-duplicate clusters (lake_content_clusters) are computed between the two steps.
+STAGING_SQL = """
+    create or replace table stg_telegram_messages as
+    with src as (
+        select
+            message_id,
+            trim(lower(channel_name)) as channel_name,
+            message_ts,
+            coalesce(message_text, '') as message_text,
+            coalesce(has_media, false) as has_media,
+            nullif(image_path, '') as image_path,
+            coalesce(views, 0) as view_count,
+            coalesce(forwards, 0) as forward_count,
+            (image_path is not null and image_path <> '') as has_image
+        from lake_messages
+        where message_id is not null
+          and message_ts is not null
+    ),
+    deduped as (
+        select
+            *,
+            row_number() over (
+                partition by channel_name, message_id
+                order by view_count desc, forward_count desc
+            ) as rn
+        from src
+    )
+    select
+        message_id, channel_name, message_ts, message_text, has_media,
+        image_path, view_count, forward_count, has_image,
+        length(message_text) as message_length
+    from deduped
+    where rn = 1
+"""
+
+STAR_SCHEMA_SQL = [
+    """
+    create or replace table dim_channels as
+    with base as (
+        select
+            channel_name,
+            min(message_ts)::date as first_post_date,
+            max(message_ts)::date as last_post_date,
+            count(*) as total_posts,
+            avg(view_count)::decimal(12,2) as avg_views
+        from stg_telegram_messages
+        group by 1
+    )
+    select
+        md5(coalesce(channel_name, '_dbt_utils_surrogate_key_null_')) as channel_key,
+        channel_name,
+        case
+            when channel_name like '%pharma%' then 'Pharmaceutical'
+            when channel_name like '%cosmetic%' or channel_name like '%lobelia%' then 'Cosmetics'
+            else 'Medical'
+        end as channel_type,
+        first_post_date,
+        last_post_date,
+        total_posts,
+        avg_views
+    from base
+    """,
+    """
+    create or replace table dim_dates as
+    with dates as (
+        select distinct message_ts::date as full_date
+        from stg_telegram_messages
+    )
+    select
+        year(full_date) * 10000 + month(full_date) * 100 + day(full_date) as date_key,
+        full_date,
+        isodow(full_date) as day_of_week,
+        dayname(full_date) as day_name,
+        weekofyear(full_date) as week_of_year,
+        month(full_date) as month,
+        monthname(full_date) as month_name,
+        quarter(full_date) as quarter,
+        year(full_date) as year,
+        isodow(full_date) in (6, 7) as is_weekend
+    from dates
+    """,
+    """
+    create or replace table fct_messages as
+    select
+        m.message_id,
+        c.channel_key,
+        d.date_key,
+        m.message_text,
+        m.message_length,
+        m.view_count,
+        m.forward_count,
+        m.has_image,
+        cl.content_cluster_id,
+        (
+            cl.content_cluster_id is null
+            or row_number() over (
+                partition by cl.content_cluster_id
+                order by m.message_ts, m.channel_name, m.message_id
+            ) = 1
+        ) as is_canonical
+    from stg_telegram_messages m
+    join dim_channels c on m.channel_name = c.channel_name
+    join dim_dates d on m.message_ts::date = d.full_date
+    left join lake_content_clusters cl
+      on cl.channel_name = m.channel_name
+     and cl.message_id = m.message_id
+    """,
+    """
+    create or replace table fct_image_detections as
+    select
+        det.message_id,
+        msg.channel_key,
+        msg.date_key,
+        det.detected_class,
+        det.confidence_score,
+        det.image_category,
+        msg.view_count
+    from lake_yolo_detections det
+    join dim_channels c on trim(lower(det.channel_name)) = c.channel_name
+    join fct_messages msg
+      on msg.channel_key = c.channel_key
+     and msg.message_id = det.message_id
+    where det.message_id is not null
+    """,
+    # Precomputed report (Postgres: materialized view from src/refresh_views.py)
+    """
+    create or replace table rpt_visual_content as
+    select
+        c.channel_name,
+        sum(case when m.has_image then 1 else 0 end) as posts_with_images,
+        count(*) as total_posts,
+        sum(case when m.has_image then 1 else 0 end)::double / nullif(count(*), 0) as image_rate
+    from fct_messages m
+    join dim_channels c on m.channel_key = c.channel_key
+    group by c.channel_name
+    """,
+]
+
+# Run after lake_product_mentions is extracted (see DuckDBBackend._extract_products)
+PRODUCT_MENTIONS_SQL = [
+    """
+    create or replace table fct_product_mentions as
+    select
+        pm.message_id,
+        msg.channel_key,
+        msg.date_key,
+        pm.product_name,
+        pm.category,
+        pm.mention_count
+    from lake_product_mentions pm
+    join dim_channels c on pm.channel_name = c.channel_name
+    join fct_messages msg
+      on msg.channel_key = c.channel_key
+     and msg.message_id = pm.message_id
+    """,
+    """
+    create or replace table rpt_top_products as
+    select
+        product_name as term,
+        min(category) as category,
+        count(*) as mentions
+    from fct_product_mentions
+    group by product_name
+    """,
+]
+
+ENGAGEMENT_COLUMNS = (
+    "{'channel_name': 'VARCHAR', 'message_id': 'BIGINT', 'polled_at': 'VARCHAR', "
+    "'views': 'BIGINT', 'forwards': 'BIGINT'}"
+)
+
+# Same as stg_message_engagement + fct_message_engagement, over the lake's snapshot files
+ENGAGEMENT_SQL = """
+    create or replace table fct_message_engagement as
+    with snap as (
+        select distinct
+            trim(lower(channel_name)) as channel_name,
+            message_id,
+            polled_at::timestamptz as polled_at,
+            views as view_count,
+            forwards as forward_count
+        from lake_message_engagement
+        where message_id is not null
+    ),
+    points as (
+        select
+            snap.message_id,
+            c.channel_key,
+            d.date_key,
+            snap.polled_at,
+            extract(epoch from (snap.polled_at - m.message_ts)) / 3600.0 as hours_since_post,
+            snap.view_count,
+            snap.forward_count,
+            lag(snap.polled_at) over w as prev_polled_at,
+            lag(snap.view_count) over w as prev_view_count,
+            lag(snap.forward_count) over w as prev_forward_count
+        from snap
+        join dim_channels c on snap.channel_name = c.channel_name
+        join stg_telegram_messages m
+          on m.channel_name = snap.channel_name
+         and m.message_id = snap.message_id
+        join dim_dates d on m.message_ts::date = d.full_date
+        window w as (partition by snap.channel_name, snap.message_id order by snap.polled_at)
+    )
+    select
+        message_id,
+        channel_key,
+        date_key,
+        polled_at,
+        hours_since_post,
+        view_count,
+        forward_count,
+        view_count - prev_view_count as views_gained,
+        forward_count - prev_forward_count as forwards_gained,
+        (view_count - prev_view_count)
+            / nullif(extract(epoch from (polled_at - prev_polled_at)) / 3600.0, 0) as views_per_hour
+    from points
+"""
+
+ENGAGEMENT_CURVE_SQL = """
+    select
+        strftime(timezone('UTC', e.polled_at), '%Y-%m-%dT%H:%M:%S+00:00') as polled_at,
+        e.hours_since_post::double as hours_since_post,
+        e.view_count,
+        e.forward_count,
+        e.views_per_hour::double as views_per_hour
+    from fct_message_engagement e
+    join dim_channels c on e.channel_key = c.channel_key
+    where c.channel_name = ?
+      and e.message_id = ?
+    order by e.polled_at
+"""
+
+TOP_PRODUCTS_SQL = """
+    select
+        p.product_name as term,
+        count(*) as mentions,
+        min(p.category) as category
+    from fct_product_mentions p
+    join dim_channels c on p.channel_key = c.channel_key
+    where (?::varchar is null or c.channel_name = ?)
+      and (?::integer is null or p.date_key >= ?)
+      and (?::integer is null or p.date_key <= ?)
+    group by p.product_name
+    order by mentions desc, term
+    limit ?
+"""
+
+CHANNEL_ACTIVITY_SQL = """
+    select
+        d.full_date::varchar as date,
+        count(*) as posts,
+        avg(m.view_count)::double as avg_views
+    from fct_messages m
+    join dim_channels c on m.channel_key = c.channel_key
+    join dim_dates d on m.date_key = d.date_key
+    where c.channel_name = ?
+    group by d.full_date
+    order by d.full_date
+"""
+
+SEARCH_MESSAGES_SQL = """
+    select
+        m.message_id,
+        c.channel_name,
+        d.full_date::varchar as message_date,
+        m.view_count,
+        m.forward_count,
+        m.has_image,
+        m.message_text,
+        m.content_cluster_id
+    from fct_messages m
+    join dim_channels c on m.channel_key = c.channel_key
+    join dim_dates d on m.date_key = d.date_key
+    where m.message_text ilike ?
+    order by d.full_date desc, m.view_count desc
+    limit ?
+"""
+
+# One row per near-duplicate cluster: its canonical copy (fct_messages.is_canonical)
+SEARCH_MESSAGES_COLLAPSED_SQL = """
+    select
+        m.message_id,
+        c.channel_name,
+        d.full_date::varchar as message_date,
+        m.view_count,
+        m.forward_count,
+        m.has_image,
+        m.message_text,
+        m.content_cluster_id
+    from fct_messages m
+    join dim_channels c on m.channel_key = c.channel_key
+    join dim_dates d on m.date_key = d.date_key
+    where m.message_text ilike ?
+      and m.is_canonical
+    order by d.full_date desc, m.view_count desc
+    limit ?
+"""
+
+
+def _sql_list(paths: list[Path]) -> str:
+    return "[" + ", ".join("'" + str(p).replace("'", "''") + "'" for p in paths) + "]"
+
+
+def lake_files() -> list[Path]:
+    """Lake partitions exactly as the Postgres loader sees them (Parquet wins over JSON)."""
+    base = Path(RAW_DATA_DIR) / "telegram_messages"
+    return collect_files() if base.exists() else []
+
+
+def engagement_files() -> list[Path]:
+    """Engagement snapshot files written by `python -m src.scraper --engagement`."""
+    return sorted(ENGAGEMENT_DIR.rglob("*.json")) if ENGAGEMENT_DIR.exists() else []
+
+
+def lake_fingerprint(files: list[Path]) -> str:
+    h = hashlib.sha1()
+    extra = [fp for fp in (YOLO_CSV, PRODUCT_DICTIONARY) if fp.exists()] + engagement_files()
+    for fp in files + extra:
+        st = fp.stat()
+        h.update(f"{fp}|{st.st_size}|{st.st_mtime_ns}\n".encode("utf-8"))
+    return h.hexdigest()
+
+
+class DuckDBBackend(QueryBackend):
+    """Embedded, vectorized query engine over the raw lake (see module docstring)."""
+
+    name = "duckdb"
+
+    def __init__(self, path: str = DUCKDB_PATH, refresh_seconds: float = DUCKDB_REFRESH_SECONDS):
+        if duckdb is None:
+            raise RuntimeError("API_BACKEND=duckdb requires duckdb. Run: pip install duckdb")
+        self.path = path
+        self.refresh_seconds = refresh_seconds
+        self._con = None
+        self._build_lock = threading.Lock()
+        self._checked_at = 0.0
+
+    def startup(self):
+        Path(self.path).parent.mkdir(parents=True, exist_ok=True)
+        self._con = duckdb.connect(self.path)
+        self.refresh(force=False)
+
+    def shutdown(self):
+        if self._con is not None:
+            self._con.close()
+            self._con = None
+
+    # ---------- materialization ----------
+
+    def _built_fingerprint(self, cur) -> str | None:
+        exists = cur.execute(
+            "select count(*) from information_schema.tables where table_name = '_lake_state'"
+        ).fetchone()[0]
+        if not exists:
+            return None
+        row = cur.execute("select fingerprint from _lake_state").fetchone()
+        return row[0] if row else None
+
+    def refresh(self, force: bool = False) -> bool:
+        """Rebuild the star schema if the lake changed. Returns True if rebuilt."""
+        with self._build_lock:
+            self._checked_at = time.monotonic()
+            files = lake_files()
+            fingerprint = lake_fingerprint(files)
+
+            cur = self._con.cursor()
+            try:
+                if not force and self._built_fingerprint(cur) == fingerprint:
+                    return False
+                self._build(cur, files, fingerprint)
+                return True
+            finally:
+                cur.close()
+
+    def _maybe_refresh(self):
+        if time.monotonic() - self._checked_at >= self.refresh_seconds:
+            self.refresh()
+
+    def _build(self, cur, files: list[Path], fingerprint: str):
+        json_files = [fp for fp in files if fp.suffix == ".json"]
+        parquet_files = [fp for fp in files if fp.suffix == ".parquet"]
+
+        cur.execute("SET TimeZone = 'UTC'")
+        cur.execute("begin transaction")
+        try:
+            cur.execute("""
+                create or replace table lake_messages (
+                    message_id bigint, channel_name varchar, message_ts timestamptz,
+                    message_text varchar, has_media boolean, image_path varchar,
+                    views bigint, forwards bigint
+                )
+            """)
+            if json_files:
+                cur.execute(f"""
+                    insert into lake_messages
+                    select message_id, channel_name, message_date::timestamptz, message_text,
+                           has_media, image_path, views, forwards
+                    from read_json({_sql_list(json_files)}, format = 'array', columns = {JSON_COLUMNS})
+                """)
+            if parquet_files:
+                cur.execute(f"""
+                    insert into lake_messages
+                    select message_id, channel_name::varchar, message_date, message_text,
+                           has_media, image_path, views, forwards
+                    from read_parquet({_sql_list(parquet_files)})
+                """)
+
+            if YOLO_CSV.exists():
+                cur.execute(f"""
+                    create or replace table lake_yolo_detections as
+                    select * from read_csv({_sql_list([YOLO_CSV])}, header = true, columns = {YOLO_COLUMNS})
+                """)
+            else:
+                cur.execute("""
+                    create or replace table lake_yolo_detections (
+                        run_ts varchar, channel_name varchar, message_id bigint, image_path varchar,
+                        detected_class varchar, class_id integer, confidence_score double,
+                        bbox_x1 real, bbox_y1 real, bbox_x2 real, bbox_y2 real, image_category varchar
+                    )
+                """)
+
+            cur.execute(STAGING_SQL)
+            self._cluster_messages(cur)
+            for sql in STAR_SCHEMA_SQL:
+                cur.execute(sql)
+
+            self._extract_products(cur)
+            for sql in PRODUCT_MENTIONS_SQL:
+                cur.execute(sql)
+
+            cur.execute("""
+                create or replace table lake_message_engagement (
+                    channel_name varchar, message_id bigint, polled_at varchar, views bigint, forwards bigint
+                )
+            """)
+            snapshot_files = engagement_files()
+            if snapshot_files:
+                cur.execute(f"""
+                    insert into lake_message_engagement
+                    select * from read_json({_sql_list(snapshot_files)}, format = 'array', columns = {ENGAGEMENT_COLUMNS})
+                """)
+            cur.execute(ENGAGEMENT_SQL)
+
+            cur.execute("create or replace table _lake_state (fingerprint varchar, built_at varchar)")
+            cur.execute(
+                "insert into _lake_state values (?, ?)",
+                [fingerprint, datetime.now(timezone.utc).isoformat()],
+            )
+            cur.execute("commit")
+        except Exception:
+            cur.execute("rollback")
+            raise
+
+    @staticmethod
+    def _iter_query(cur, sql: str, batch_size: int = 5000):
+        cur.execute(sql)
+        while True:
+            rows = cur.fetchmany(batch_size)
+            if not rows:
+                break
+            yield from rows
+
+    @staticmethod
+    def _stage_rows(cur, table: str, columns: dict[str, str], rows):
+        """
+        Create `table` and fill it with Python-computed rows, staged through a temp
+        CSV (one vectorized read_csv instead of row-by-row inserts). `rows` may
+        stream from `cur`: it is fully consumed before `cur` runs anything else.
+        """
+        with tempfile.TemporaryDirectory() as tmp:
+            out_path = Path(tmp) / f"{table}.csv"
+            with open(out_path, "w", encoding="utf-8", newline="") as f:
+                w = csv.writer(f)
+                written = 0
+                for row in rows:
+                    w.writerow(["" if v is None else v for v in row])
+                    written += 1
+
+            ddl = ", ".join(f"{name} {dtype}" for name, dtype in columns.items())
+            cur.execute(f"create or replace table {table} ({ddl})")
+            if written:
+                spec = "{" + ", ".join(f"'{name}': '{dtype}'" for name, dtype in columns.items()) + "}"
+                cur.execute(
+                    f"insert into {table} select * from "
+                    f"read_csv({_sql_list([out_path])}, header = false, columns = {spec})"
+                )
+
+    def _cluster_messages(self, cur):
+        """Near-duplicate clusters (same MinHash LSH as src/dedup_messages.py) into lake_content_clusters."""
+        hasher = MinHasher(num_perm=dedup.NUM_PERM, shingle_size=dedup.SHINGLE_SIZE)
+        index = LSHIndex(bands=dedup.BANDS, rows=dedup.ROWS, threshold=dedup.DEDUP_THRESHOLD)
+        ids = itertools.count(1)
+
+        def clusters():
+            for channel_name, message_id, message_text in self._iter_query(
+                cur,
+                "select channel_name, message_id, message_text from stg_telegram_messages "
+                "order by message_ts, channel_name, message_id",
+            ):
+                norm = normalize_text(message_text)
+                sig = hasher.signature(norm) if len(norm) >= dedup.DEDUP_MIN_CHARS else None
+                cid = index.assign(sig, index.band_keys(sig), ids.__next__) if sig is not None else None
+                yield channel_name, message_id, cid
+
+        self._stage_rows(
+            cur,
+            "lake_content_clusters",
+            {"channel_name": "VARCHAR", "message_id": "BIGINT", "content_cluster_id": "BIGINT"},
+            clusters(),
+        )
+
+    def _extract_products(self, cur):
+        """Dictionary product extraction (same matcher as src/extract_products.py) into lake_product_mentions."""
+        columns = {
+            "channel_name": "VARCHAR", "message_id": "BIGINT", "product_name": "VARCHAR",
+            "category": "VARCHAR", "mention_count": "INTEGER",
+        }
+        if not PRODUCT_DICTIONARY.exists():
+            self._stage_rows(cur, "lake_product_mentions", columns, [])
+            return
+        ac = build_automaton(load_dictionary())
+
+        def mentions():
+            for channel_name, message_id, message_text in self._iter_query(
+                cur,
+                "select channel_name, message_id, message_text from stg_telegram_messages "
+                "where message_text <> ''",
+            ):
+                for product, (category, count) in find_products(ac, message_text).items():
+                    yield channel_name, message_id, product, category, count
+
+        self._stage_rows(cur, "lake_product_mentions", columns, mentions())
+
+    # ---------- queries ----------
+
+    def _fetch(self, sql: str, params: list | None = None) -> list[tuple]:
+        self._maybe_refresh()
+        cur = self._con.cursor()
+        try:
+            return cur.execute(sql, params or []).fetchall()
+        finally:
+            cur.close()
+
+    def _built_at(self) -> str | None:
+        rows = self._fetch("select built_at from _lake_state")
+        return rows[0][0] if rows else None
+
+    def top_products(self, limit: int, channel_name=None, date_from=None, date_to=None):
+        if channel_name is None and date_from is None and date_to is None:
+            rows = self._fetch(
+                "select term, mentions, category from rpt_top_products "
+                "order by mentions desc, term limit ?",
+                [limit],
+            )
+        else:
+            lo, hi = date_key(date_from), date_key(date_to)
+            rows = self._fetch(TOP_PRODUCTS_SQL, [channel_name, channel_name, lo, lo, hi, hi, limit])
+        return rows, self._built_at()
+
+    def channel_activity(self, channel_name: str):
+        return self._fetch(CHANNEL_ACTIVITY_SQL, [channel_name])
+
+    def search_messages(self, pattern: str, limit: int, collapse_duplicates: bool = False):
+        sql = SEARCH_MESSAGES_COLLAPSED_SQL if collapse_duplicates else SEARCH_MESSAGES_SQL
+        return self._fetch(sql, [pattern, limit])
+
+    def engagement_curve(self, channel_name: str, message_id: int):
+        return self._fetch(ENGAGEMENT_CURVE_SQL, [channel_name, message_id])
+
+    def visual_content(self):
+        rows = self._fetch(
+            "select channel_name, posts_with_images, total_posts, image_rate "
+            "from rpt_visual_content order by posts_with_images desc"
+        )
+        return rows, self._built_at()
@@ -0,0 +1,179 @@
+from sqlalchemy import text
+from sqlalchemy.engine import Engine
+from sqlalchemy.exc import ProgrammingError
+
+from api.backends.base import QueryBackend, date_key
+from api.database import get_engine
+
+# SQL behind the endpoints (module level so scripts/check_query_plans.py can EXPLAIN it)
+# Product mentions come from the dictionary extraction stage (src/extract_products.py);
+# mentions = number of messages naming the product.
+TOP_PRODUCTS_SQL = text("""
+    select
+        p.product_name as term,
+        count(*) as mentions,
+        min(p.category) as category
+    from analytics.fct_product_mentions p
+    join analytics.dim_channels c on p.channel_key = c.channel_key
+    where (cast(:channel_name as text) is null or c.channel_name = :channel_name)
+      and (cast(:date_from as int) is null or p.date_key >= :date_from)
+      and (cast(:date_to as int) is null or p.date_key <= :date_to)
+    group by p.product_name
+    order by mentions desc, term
+    limit :limit;
+""")
+
+TOP_PRODUCTS_MV_SQL = text("""
+    select v.term, v.mentions, v.category, l.refreshed_at
+    from analytics.mv_top_products v
+    left join analytics.mv_refresh_log l on l.view_name = 'mv_top_products'
+    order by v.mentions desc, v.term
+    limit :limit;
+""")
+
+CHANNEL_ACTIVITY_SQL = text("""
+    select
+        d.full_date::text as date,
+        count(*) as posts,
+        avg(m.view_count)::float as avg_views
+    from analytics.fct_messages m
+    join analytics.dim_channels c on m.channel_key = c.channel_key
+    join analytics.dim_dates d on m.date_key = d.date_key
+    where c.channel_name = :channel_name
+    group by d.full_date
+    order by d.full_date;
+""")
+
+SEARCH_MESSAGES_SQL = text("""
+    select
+        m.message_id,
+        c.channel_name,
+        d.full_date::text as message_date,
+        m.view_count,
+        m.forward_count,
+        m.has_image,
+        m.message_text,
+        m.content_cluster_id
+    from analytics.fct_messages m
+    join analytics.dim_channels c on m.channel_key = c.channel_key
+    join analytics.dim_dates d on m.date_key = d.date_key
+    where m.message_text ilike :pattern
+    order by d.full_date desc, m.view_count desc
+    limit :limit;
+""")
+
+# One row per near-duplicate cluster: its canonical copy (fct_messages.is_canonical)
+SEARCH_MESSAGES_COLLAPSED_SQL = text("""
+    select
+        m.message_id,
+        c.channel_name,
+        d.full_date::text as message_date,
+        m.view_count,
+        m.forward_count,
+        m.has_image,
+        m.message_text,
+        m.content_cluster_id
+    from analytics.fct_messages m
+    join analytics.dim_channels c on m.channel_key = c.channel_key
+    join analytics.dim_dates d on m.date_key = d.date_key
+    where m.message_text ilike :pattern
+      and m.is_canonical
+    order by d.full_date desc, m.view_count desc
+    limit :limit;
+""")
+
+ENGAGEMENT_CURVE_SQL = text("""
+    select
+        e.polled_at,
+        e.hours_since_post::float as hours_since_post,
+        e.view_count,
+        e.forward_count,
+        e.views_per_hour::float as views_per_hour
+    from analytics.fct_message_engagement e
+    join analytics.dim_channels c on e.channel_key = c.channel_key
+    where c.channel_name = :channel_name
+      and e.message_id = :message_id
+    order by e.polled_at;
+""")
+
+VISUAL_CONTENT_SQL = text("""
+    select
+        c.channel_name,
+        sum(case when m.has_image then 1 else 0 end) as posts_with_images,
+        count(*) as total_posts,
+        (sum(case when m.has_image then 1 else 0 end)::numeric / nullif(count(*),0))::float as image_rate
+    from analytics.fct_messages m
+    join analytics.dim_channels c on m.channel_key = c.channel_key
+    group by c.channel_name
+    order by posts_with_images desc;
+""")
+
+VISUAL_CONTENT_MV_SQL = text("""
+    select v.channel_name, v.posts_with_images, v.total_posts, v.image_rate, l.refreshed_at
+    from analytics.mv_visual_content v
+    left join analytics.mv_refresh_log l on l.view_name = 'mv_visual_content'
+    order by v.posts_with_images desc;
+""")
+
+
+class PostgresBackend(QueryBackend):
+    """dbt marts (and the materialized reports from src/refresh_views.py) in Postgres."""
+
+    name = "postgres"
+
+    def __init__(self):
+        self.engine: Engine | None = None
+
+    def startup(self):
+        self.engine = get_engine()
+
+    def shutdown(self):
+        if self.engine is not None:
+            self.engine.dispose()
+
+    def _fetch(self, sql, params: dict | None = None) -> list[tuple]:
+        with self.engine.connect() as conn:
+            return conn.execute(sql, params or {}).fetchall()
+
+    def fetch_report(self, mv_sql, live_sql, params: dict | None = None):
+        """
+        Read a precomputed report from its materialized view (maintained by src/refresh_views.py).
+        Falls back to the live aggregate while the view does not exist (first deploy, or
+        between a dbt rebuild and the next refresh). Returns (rows, refreshed_at).
+        The materialized query selects refreshed_at as its last column.
+        """
+        try:
+            rows = self._fetch(mv_sql, params)
+            refreshed_at = rows[0][-1] if rows else None
+            return rows, refreshed_at.isoformat() if refreshed_at is not None else None
+        except ProgrammingError as e:
+            # 42P01 = undefined_table
+            if getattr(e.orig, "pgcode", None) != "42P01":
+                raise
+
+        return self._fetch(live_sql, params), None
+
+    def top_products(self, limit: int, channel_name=None, date_from=None, date_to=None):
+        params = {
+            "limit": limit,
+            "channel_name": channel_name,
+            "date_from": date_key(date_from),
+            "date_to": date_key(date_to),
+        }
+        # The materialized report covers all channels and dates; filtered requests run live
+        if channel_name is None and date_from is None and date_to is None:
+            return self.fetch_report(TOP_PRODUCTS_MV_SQL, TOP_PRODUCTS_SQL, params)
+        return self._fetch(TOP_PRODUCTS_SQL, params), None
+
+    def channel_activity(self, channel_name: str):
+        return self._fetch(CHANNEL_ACTIVITY_SQL, {"channel_name": channel_name})
+
+    def search_messages(self, pattern: str, limit: int, collapse_duplicates: bool = False):
+        sql = SEARCH_MESSAGES_COLLAPSED_SQL if collapse_duplicates else SEARCH_MESSAGES_SQL
+        return self._fetch(sql, {"pattern": pattern, "limit": limit})
+
+    def engagement_curve(self, channel_name: str, message_id: int):
+        return self._fetch(ENGAGEMENT_CURVE_SQL, {"channel_name": channel_name, "message_id": message_id})
+
+    def visual_content(self):
+        return self.fetch_report(VISUAL_CONTENT_MV_SQL, VISUAL_CONTENT_SQL)
@@ -0,0 +1,152 @@
+# api/load_control.py
+"""
+Request coalescing and load shedding for the expensive endpoints.
+
+A dashboard reload fires dozens of identical report requests at once. Each
+guarded endpoint call goes through two layers:
+
+1. Single-flight: concurrent calls with the same key (endpoint + parameters)
+   share one in-flight execution; followers wait for the leader's result (or
+   exception) instead of running the same query again.
+2. Per-endpoint concurrency limit: at most API_MAX_CONCURRENT executions run
+   at once, and at most API_MAX_QUEUE more may wait for a slot (for up to
+   API_QUEUE_TIMEOUT seconds). Beyond that the call fails fast with Overloaded,
+   which the API turns into 503 + Retry-After.
+
+Followers never take a slot or a queue position, so identical requests cannot
+be shed while their query is already running. Counters are exposed via
+snapshot() (served at /debug/load).
+
+Endpoints are sync (FastAPI runs them in its thread pool), so this is thread based.
+"""
+import os
+import threading
+import time
+
+MAX_CONCURRENT = int(os.getenv("API_MAX_CONCURRENT", "4"))
+MAX_QUEUE = int(os.getenv("API_MAX_QUEUE", "16"))
+QUEUE_TIMEOUT = float(os.getenv("API_QUEUE_TIMEOUT", "5"))
+RETRY_AFTER_SECONDS = int(os.getenv("API_RETRY_AFTER_SECONDS", "2"))
+
+
+class Overloaded(Exception):
+    def __init__(self, endpoint: str, retry_after: int = RETRY_AFTER_SECONDS):
+        super().__init__(f"{endpoint} is overloaded, retry in {retry_after}s")
+        self.endpoint = endpoint
+        self.retry_after = retry_after
+
+
+class _Call:
+    __slots__ = ("done", "result", "error", "followers")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error: BaseException | None = None
+        self.followers = 0
+
+
+class EndpointGuard:
+    """Single-flight + bounded concurrency for one endpoint (see module docstring)."""
+
+    def __init__(
+        self,
+        name: str,
+        max_concurrent: int = MAX_CONCURRENT,
+        max_queue: int = MAX_QUEUE,
+        queue_timeout: float = QUEUE_TIMEOUT,
+    ):
+        self.name = name
+        self.max_concurrent = max_concurrent
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+
+        self._lock = threading.Lock()
+        self._slots = threading.Semaphore(max_concurrent)
+        self._inflight: dict[tuple, _Call] = {}
+        self._waiting = 0
+        self.stats = {"requests": 0, "executions": 0, "coalesced": 0, "shed": 0, "timeouts": 0}
+
+    def run(self, key: tuple, fn):
+        """Return fn() for this key, sharing one execution among concurrent identical calls."""
+        with self._lock:
+            self.stats["requests"] += 1
+            call = self._inflight.get(key)
+            if call is not None:
+                call.followers += 1
+                self.stats["coalesced"] += 1
+                leader = False
+            else:
+                call = _Call()
+                self._inflight[key] = call
+                leader = True
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = self._execute(fn)
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._inflight[key]
+            call.done.set()
+        return call.result
+
+    def _execute(self, fn):
+        if not self._slots.acquire(blocking=False):
+            with self._lock:
+                if self._waiting >= self.max_queue:
+                    self.stats["shed"] += 1
+                    raise Overloaded(self.name)
+                self._waiting += 1
+            try:
+                acquired = self._slots.acquire(timeout=self.queue_timeout)
+            finally:
+                with self._lock:
+                    self._waiting -= 1
+            if not acquired:
+                with self._lock:
+                    self.stats["timeouts"] += 1
+                raise Overloaded(self.name)
+
+        try:
+            with self._lock:
+                self.stats["executions"] += 1
+            return fn()
+        finally:
+            self._slots.release()
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                "endpoint": self.name,
+                "max_concurrent": self.max_concurrent,
+                "max_queue": self.max_queue,
+                "inflight": len(self._inflight),
+                "waiting": self._waiting,
+                **self.stats,
+            }
+
+
+_guards: dict[str, EndpointGuard] = {}
+_guards_lock = threading.Lock()
+
+
+def guard(endpoint: str) -> EndpointGuard:
+    with _guards_lock:
+        g = _guards.get(endpoint)
+        if g is None:
+            g = _guards[endpoint] = EndpointGuard(endpoint)
+        return g
+
+
+def snapshot() -> list[dict]:
+    with _guards_lock:
+        guards = list(_guards.values())
+    return [g.snapshot() for g in guards]
@@ -1,29 +1,64 @@
-from fastapi import FastAPI, HTTPException, Query
-from sqlalchemy import text
-from sqlalchemy.engine import Engine
+from datetime import date
+from typing import Optional
 
-from api.database import get_engine
+from fastapi import FastAPI, HTTPException, Query, Request
+from fastapi.responses import JSONResponse
+
+from api import load_control, profiler
+from api.load_control import Overloaded
+from api.backends import QueryBackend, get_backend
+from api.similar_images import SimilarImageIndex
 from api.schemas import (
     TopProductsResponse, TopProductItem,
     ChannelActivityResponse, ChannelActivityItem,
+    EngagementCurveResponse, EngagementPoint,
     MessageSearchResponse, MessageSearchItem,
-    VisualContentResponse, VisualContentItem
+    VisualContentResponse, VisualContentItem,
+    SimilarImagesResponse, SimilarImageItem,
+    DbProfileResponse, LoadControlResponse,
 )
 
 app = FastAPI(
     title="Medical Telegram Analytical API",
     version="1.0.0",
-    description="Analytical API over transformed Telegram data (dbt marts in Postgres)."
+    description="Analytical API over transformed Telegram data (dbt marts in Postgres, or embedded DuckDB over the lake)."
 )
 
-# Create engine on startup (safer with reload)
-engine: Engine | None = None
+# Opt-in query profiling (API_PROFILE=1): Server-Timing header + /debug/db-profile
+if profiler.PROFILE_ENABLED:
+    app.middleware("http")(profiler.profile_requests)
+
+# Create backend on startup (safer with reload); API_BACKEND=postgres|duckdb
+backend: QueryBackend | None = None
+
+# Image embeddings from src/yolo_detect.py (files on disk, independent of the query backend)
+image_index = SimilarImageIndex()
 
 
 @app.on_event("startup")
 def startup_event():
-    global engine
-    engine = get_engine()
+    global backend
+    backend = get_backend()
+    backend.startup()
+    # Only SQLAlchemy-engine backends (Postgres) can be profiled
+    if profiler.PROFILE_ENABLED and getattr(backend, "engine", None) is not None:
+        profiler.instrument(backend.engine)
+
+
+@app.on_event("shutdown")
+def shutdown_event():
+    if backend is not None:
+        backend.shutdown()
+
+
+@app.exception_handler(Overloaded)
+def overloaded_handler(request: Request, exc: Overloaded):
+    # Load shedding (api/load_control.py): tell clients when to come back
+    return JSONResponse(
+        status_code=503,
+        content={"detail": str(exc)},
+        headers={"Retry-After": str(exc.retry_after)},
+    )
 
 
 @app.get("/health")
@@ -31,45 +66,52 @@ def health():
     return {"status": "ok"}
 
 
-# 1) Top Products (basic token frequency)
+@app.get("/debug/db-profile", response_model=DbProfileResponse)
+def db_profile():
+    """
+    Aggregated DB time per endpoint and the recent slow-query log (with sampled plans).
+    Only available when API_PROFILE=1.
+    """
+    if not profiler.PROFILE_ENABLED:
+        raise HTTPException(status_code=404, detail="Profiling is disabled (set API_PROFILE=1)")
+
+    return DbProfileResponse(**profiler.snapshot())
+
+
+@app.get("/debug/load", response_model=LoadControlResponse)
+def load_stats():
+    """Per-endpoint request coalescing and load-shedding counters."""
+    return LoadControlResponse(endpoints=load_control.snapshot())
+
+
+# 1) Top Products (dictionary product mentions)
 @app.get("/api/reports/top-products", response_model=TopProductsResponse)
-def top_products(limit: int = Query(10, ge=1, le=100)):
+def top_products(
+    limit: int = Query(10, ge=1, le=100),
+    channel: Optional[str] = Query(None, description="Only messages from this channel"),
+    date_from: Optional[date] = Query(None, description="Inclusive start date (YYYY-MM-DD)"),
+    date_to: Optional[date] = Query(None, description="Inclusive end date (YYYY-MM-DD)"),
+):
     """
-    Returns most frequent tokens from message_text across all channels.
-    Note: This is a basic approach (split by whitespace + cleanup).
+    Returns the most mentioned products, extracted at load time by matching the
+    product dictionary against message_text. Optionally filtered by channel and date.
+    The unfiltered report is served from the precomputed view.
     """
-    if engine is None:
-        raise HTTPException(status_code=500, detail="Database engine not initialized")
-
-    sql = text("""
-        with cleaned as (
-            select coalesce(message_text, '') as txt
-            from analytics.fct_messages
-        ),
-        tokens as (
-            select
-                lower(regexp_replace(token, '[^a-z0-9]+', '', 'g')) as term
-            from cleaned,
-                 unnest(regexp_split_to_array(txt, '\\s+')) as token
-        )
-        select term, count(*) as mentions
-        from tokens
-        where term is not null
-          and term <> ''
-          and length(term) >= 4
-        group by term
-        order by mentions desc
-        limit :limit;
-    """)
+    if backend is None:
+        raise HTTPException(status_code=500, detail="Query backend not initialized")
 
     try:
-        with engine.connect() as conn:
-            rows = conn.execute(sql, {"limit": limit}).fetchall()
+        rows, refreshed_at = load_control.guard("top_products").run(
+            (limit, channel, date_from, date_to),
+            lambda: backend.top_products(limit, channel_name=channel, date_from=date_from, date_to=date_to),
+        )
+    except Overloaded:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"DB error: {e}")
 
-    results = [TopProductItem(term=r[0], mentions=int(r[1])) for r in rows]
-    return TopProductsResponse(limit=limit, results=results)
+    results = [TopProductItem(term=r[0], mentions=int(r[1]), category=r[2]) for r in rows]
+    return TopProductsResponse(limit=limit, refreshed_at=refreshed_at, results=results)
 
 
 # 2) Channel Activity
@@ -78,25 +120,11 @@ def channel_activity(channel_name: str):
     """
     Daily post counts and average views for a specific channel.
     """
-    if engine is None:
-        raise HTTPException(status_code=500, detail="Database engine not initialized")
-
-    sql = text("""
-        select
-            d.full_date::text as date,
-            count(*) as posts,
-            avg(m.view_count)::float as avg_views
-        from analytics.fct_messages m
-        join analytics.dim_channels c on m.channel_key = c.channel_key
-        join analytics.dim_dates d on m.date_key = d.date_key
-        where c.channel_name = :channel_name
-        group by d.full_date
-        order by d.full_date;
-    """)
+    if backend is None:
+        raise HTTPException(status_code=500, detail="Query backend not initialized")
 
     try:
-        with engine.connect() as conn:
-            rows = conn.execute(sql, {"channel_name": channel_name.strip().lower()}).fetchall()
+        rows = backend.channel_activity(channel_name.strip().lower())
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"DB error: {e}")
 
@@ -118,36 +146,25 @@ def channel_activity(channel_name: str):
 @app.get("/api/search/messages", response_model=MessageSearchResponse)
 def search_messages(
     query: str = Query(..., min_length=2),
-    limit: int = Query(20, ge=1, le=200)
+    limit: int = Query(20, ge=1, le=200),
+    collapse_duplicates: bool = Query(True, description="Return one message per near-duplicate cluster"),
 ):
     """
     Search messages containing a keyword (case-insensitive).
+    Cross-posted / reposted copies of the same text are collapsed to their canonical (first) post by default.
     """
-    if engine is None:
-        raise HTTPException(status_code=500, detail="Database engine not initialized")
-
-    sql = text("""
-        select
-            m.message_id,
-            c.channel_name,
-            d.full_date::text as message_date,
-            m.view_count,
-            m.forward_count,
-            m.has_image,
-            m.message_text
-        from analytics.fct_messages m
-        join analytics.dim_channels c on m.channel_key = c.channel_key
-        join analytics.dim_dates d on m.date_key = d.date_key
-        where m.message_text ilike :pattern
-        order by d.full_date desc, m.view_count desc
-        limit :limit;
-    """)
+    if backend is None:
+        raise HTTPException(status_code=500, detail="Query backend not initialized")
 
     pattern = f"%{query}%"
 
     try:
-        with engine.connect() as conn:
-            rows = conn.execute(sql, {"pattern": pattern, "limit": limit}).fetchall()
+        rows = load_control.guard("search_messages").run(
+            (pattern.lower(), limit, collapse_duplicates),
+            lambda: backend.search_messages(pattern, limit, collapse_duplicates=collapse_duplicates),
+        )
+    except Overloaded:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"DB error: {e}")
 
@@ -159,7 +176,8 @@ def search_messages(
             views=int(r[3]) if r[3] is not None else 0,
             forwards=int(r[4]) if r[4] is not None else 0,
             has_image=bool(r[5]),
-            message_text=r[6] or ""
+            message_text=r[6] or "",
+            content_cluster_id=int(r[7]) if r[7] is not None else None,
         )
         for r in rows
     ]
@@ -173,24 +191,13 @@ def visual_content():
     """
     Stats about image usage across channels.
     """
-    if engine is None:
-        raise HTTPException(status_code=500, detail="Database engine not initialized")
-
-    sql = text("""
-        select
-            c.channel_name,
-            sum(case when m.has_image then 1 else 0 end) as posts_with_images,
-            count(*) as total_posts,
-            (sum(case when m.has_image then 1 else 0 end)::numeric / nullif(count(*),0))::float as image_rate
-        from analytics.fct_messages m
-        join analytics.dim_channels c on m.channel_key = c.channel_key
-        group by c.channel_name
-        order by posts_with_images desc;
-    """)
+    if backend is None:
+        raise HTTPException(status_code=500, detail="Query backend not initialized")
 
     try:
-        with engine.connect() as conn:
-            rows = conn.execute(sql).fetchall()
+        rows, refreshed_at = load_control.guard("visual_content").run((), backend.visual_content)
+    except Overloaded:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"DB error: {e}")
 
@@ -206,4 +213,66 @@ def visual_content():
             )
         )
 
-    return VisualContentResponse(results=results)
+    return VisualContentResponse(refreshed_at=refreshed_at, results=results)
+
+
+# 5) Similar Images
+@app.get("/api/images/similar", response_model=SimilarImagesResponse)
+def similar_images(
+    channel: str = Query(..., description="Channel of the query image's message"),
+    message_id: int = Query(..., description="Message id of the query image"),
+    k: int = Query(10, ge=1, le=100),
+):
+    """
+    Where else has this image appeared: the k most similar images (approximate
+    nearest neighbors over the YOLO backbone embeddings), with their channel/message ids.
+    """
+    channel = channel.strip().lower()
+    try:
+        rows = image_index.similar(channel, message_id, k)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Image index error: {e}")
+
+    if rows is None:
+        raise HTTPException(status_code=404, detail=f"No embedding for image of {channel}/{message_id}")
+
+    results = [
+        SimilarImageItem(channel_name=r[0], message_id=int(r[1]), image_path=r[2], score=round(float(r[3]), 4))
+        for r in rows
+    ]
+    return SimilarImagesResponse(channel_name=channel, message_id=message_id, k=k, results=results)
+
+
+# 6) Message Engagement Curve
+@app.get(
+    "/api/channels/{channel_name}/messages/{message_id}/engagement",
+    response_model=EngagementCurveResponse,
+)
+def message_engagement(channel_name: str, message_id: int):
+    """
+    Views/forwards of one message over time, one point per observed change
+    (polled by `python -m src.scraper --engagement`).
+    """
+    if backend is None:
+        raise HTTPException(status_code=500, detail="Query backend not initialized")
+
+    channel_name = channel_name.strip().lower()
+    try:
+        rows = backend.engagement_curve(channel_name, message_id)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"DB error: {e}")
+
+    if not rows:
+        raise HTTPException(status_code=404, detail=f"No engagement history for {channel_name}/{message_id}")
+
+    points = [
+        EngagementPoint(
+            polled_at=r[0].isoformat() if hasattr(r[0], "isoformat") else str(r[0]),
+            hours_since_post=float(r[1]) if r[1] is not None else None,
+            views=int(r[2]),
+            forwards=int(r[3]),
+            views_per_hour=float(r[4]) if r[4] is not None else None,
+        )
+        for r in rows
+    ]
+    return EngagementCurveResponse(channel_name=channel_name, message_id=message_id, points=points)
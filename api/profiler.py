@@ -0,0 +1,182 @@
+# api/profiler.py
+"""
+Opt-in DB query profiler for the API.
+
+Enable with API_PROFILE=1. When enabled:
+- every cursor execution on the engine is timed and attributed to the current request
+- each response carries a Server-Timing header with the request's DB time
+- statements slower than API_SLOW_QUERY_MS are logged; a sample of them
+  (API_EXPLAIN_SAMPLE_RATE) is re-run with EXPLAIN (ANALYZE, BUFFERS) to capture the plan
+- aggregated per-endpoint DB time is exposed via snapshot() (served at /debug/db-profile)
+"""
+import logging
+import os
+import random
+import threading
+import time
+from collections import deque
+from contextvars import ContextVar
+from datetime import datetime, timezone
+
+from fastapi import Request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+PROFILE_ENABLED = os.getenv("API_PROFILE", "0").strip().lower() in ("1", "true", "yes")
+SLOW_QUERY_MS = float(os.getenv("API_SLOW_QUERY_MS", "200"))
+EXPLAIN_SAMPLE_RATE = float(os.getenv("API_EXPLAIN_SAMPLE_RATE", "0.1"))
+SLOW_LOG_SIZE = int(os.getenv("API_SLOW_LOG_SIZE", "50"))
+
+logger = logging.getLogger("api.profiler")
+
+# Per-request accumulator; set by the middleware, filled by the engine hooks.
+_request_stats: ContextVar[dict | None] = ContextVar("db_request_stats", default=None)
+
+_lock = threading.Lock()
+_endpoint_stats: dict[str, dict] = {}
+_slow_queries: deque = deque(maxlen=SLOW_LOG_SIZE)
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("profiler_query_start", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started = conn.info["profiler_query_start"].pop()
+    elapsed_ms = (time.perf_counter() - started) * 1000.0
+
+    stats = _request_stats.get()
+    if stats is not None:
+        stats["db_ms"] += elapsed_ms
+        stats["queries"] += 1
+
+    if elapsed_ms >= SLOW_QUERY_MS:
+        _record_slow_query(cursor, statement, parameters, elapsed_ms, stats)
+
+
+def _handle_error(exception_context):
+    # Failed statements never reach after_cursor_execute; still count their time
+    conn = exception_context.connection
+    starts = conn.info.get("profiler_query_start") if conn is not None else None
+    if not starts:
+        return
+    elapsed_ms = (time.perf_counter() - starts.pop()) * 1000.0
+    stats = _request_stats.get()
+    if stats is not None:
+        stats["db_ms"] += elapsed_ms
+        stats["queries"] += 1
+
+
+def _explain(cursor, statement: str, parameters) -> str | None:
+    """
+    Re-run a statement under EXPLAIN (ANALYZE, BUFFERS) on the same connection.
+    Uses a fresh cursor (the original one may still hold unfetched rows) and a
+    savepoint so a failing EXPLAIN cannot abort the caller's transaction.
+    """
+    if not statement.lstrip().lower().startswith(("select", "with")):
+        return None
+
+    dbapi_conn = cursor.connection
+    explain_cur = dbapi_conn.cursor()
+    try:
+        explain_cur.execute("SAVEPOINT profiler_explain")
+        try:
+            explain_cur.execute("EXPLAIN (ANALYZE, BUFFERS) " + statement, parameters)
+            plan = "\n".join(r[0] for r in explain_cur.fetchall())
+            explain_cur.execute("RELEASE SAVEPOINT profiler_explain")
+            return plan
+        except Exception as e:
+            explain_cur.execute("ROLLBACK TO SAVEPOINT profiler_explain")
+            logger.warning("EXPLAIN failed: %s", e)
+            return None
+    finally:
+        explain_cur.close()
+
+
+def _record_slow_query(cursor, statement, parameters, elapsed_ms: float, stats: dict | None):
+    plan = None
+    if random.random() < EXPLAIN_SAMPLE_RATE:
+        plan = _explain(cursor, statement, parameters)
+
+    endpoint = stats.get("endpoint") if stats else None
+    entry = {
+        "ts": datetime.now(timezone.utc).isoformat(),
+        "endpoint": endpoint,
+        "duration_ms": round(elapsed_ms, 2),
+        "statement": " ".join(statement.split()),
+        "plan": plan,
+    }
+    with _lock:
+        _slow_queries.append(entry)
+
+    logger.warning(
+        "Slow query (%.1f ms) on %s: %s%s",
+        elapsed_ms, endpoint, entry["statement"],
+        f"\n{plan}" if plan else "",
+    )
+
+
+def instrument(engine: Engine):
+    """Attach timing hooks to an engine (idempotent)."""
+    if not event.contains(engine, "before_cursor_execute", _before_cursor_execute):
+        event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+        event.listen(engine, "handle_error", _handle_error)
+
+
+async def profile_requests(request: Request, call_next):
+    """HTTP middleware: collect DB time per request and emit Server-Timing."""
+    stats = {"db_ms": 0.0, "queries": 0, "endpoint": request.url.path}
+    token = _request_stats.set(stats)
+    started = time.perf_counter()
+    try:
+        response = await call_next(request)
+    finally:
+        _request_stats.reset(token)
+    total_ms = (time.perf_counter() - started) * 1000.0
+
+    # Router stores the matched route in the (shared) scope; group by its template
+    route = request.scope.get("route")
+    endpoint = getattr(route, "path", request.url.path)
+
+    with _lock:
+        agg = _endpoint_stats.setdefault(
+            endpoint,
+            {"requests": 0, "queries": 0, "db_ms_total": 0.0, "db_ms_max": 0.0, "total_ms": 0.0},
+        )
+        agg["requests"] += 1
+        agg["queries"] += stats["queries"]
+        agg["db_ms_total"] += stats["db_ms"]
+        agg["db_ms_max"] = max(agg["db_ms_max"], stats["db_ms"])
+        agg["total_ms"] += total_ms
+
+    response.headers["Server-Timing"] = (
+        f'db;dur={stats["db_ms"]:.2f};desc="{stats["queries"]} queries", '
+        f"app;dur={total_ms:.2f}"
+    )
+    return response
+
+
+def snapshot() -> dict:
+    """Aggregated per-endpoint DB time plus the recent slow-query log."""
+    with _lock:
+        endpoints = [
+            {
+                "endpoint": name,
+                "requests": agg["requests"],
+                "queries": agg["queries"],
+                "db_ms_total": round(agg["db_ms_total"], 2),
+                "db_ms_avg": round(agg["db_ms_total"] / agg["requests"], 2),
+                "db_ms_max": round(agg["db_ms_max"], 2),
+                "total_ms_avg": round(agg["total_ms"] / agg["requests"], 2),
+            }
+            for name, agg in sorted(_endpoint_stats.items())
+        ]
+        slow = list(reversed(_slow_queries))
+
+    return {
+        "slow_query_ms": SLOW_QUERY_MS,
+        "explain_sample_rate": EXPLAIN_SAMPLE_RATE,
+        "endpoints": endpoints,
+        "slow_queries": slow,
+    }
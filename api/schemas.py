@@ -3,12 +3,14 @@ from pydantic import BaseModel, Field
 
 
 class TopProductItem(BaseModel):
-    term: str = Field(..., description="Extracted product/term token from message_text")
-    mentions: int = Field(..., ge=0, description="Number of messages mentioning the term")
+    term: str = Field(..., description="Canonical product name from the product dictionary")
+    mentions: int = Field(..., ge=0, description="Number of messages mentioning the product")
+    category: Optional[str] = Field(None, description="Dictionary category, e.g. analgesic")
 
 
 class TopProductsResponse(BaseModel):
     limit: int
+    refreshed_at: Optional[str] = Field(None, description="Last refresh of the precomputed report; null when computed live")
     results: List[TopProductItem]
 
 
@@ -23,6 +25,20 @@ class ChannelActivityResponse(BaseModel):
     daily: List[ChannelActivityItem]
 
 
+class EngagementPoint(BaseModel):
+    polled_at: str
+    hours_since_post: Optional[float] = Field(None, description="Message age at polled_at")
+    views: int
+    forwards: int
+    views_per_hour: Optional[float] = Field(None, description="View growth rate since the previous point")
+
+
+class EngagementCurveResponse(BaseModel):
+    channel_name: str
+    message_id: int
+    points: List[EngagementPoint]
+
+
 class MessageSearchItem(BaseModel):
     message_id: int
     channel_name: str
@@ -31,6 +47,7 @@ class MessageSearchItem(BaseModel):
     forwards: int
     has_image: bool
     message_text: str
+    content_cluster_id: Optional[int] = Field(None, description="Near-duplicate cluster shared with reposts/cross-posts")
 
 
 class MessageSearchResponse(BaseModel):
@@ -47,4 +64,61 @@ class VisualContentItem(BaseModel):
 
 
 class VisualContentResponse(BaseModel):
+    refreshed_at: Optional[str] = Field(None, description="Last refresh of the precomputed report; null when computed live")
     results: List[VisualContentItem]
+
+
+class SimilarImageItem(BaseModel):
+    channel_name: str
+    message_id: int
+    image_path: str
+    score: float = Field(..., description="Cosine similarity of the image embeddings (1.0 = identical)")
+
+
+class SimilarImagesResponse(BaseModel):
+    channel_name: str
+    message_id: int
+    k: int
+    results: List[SimilarImageItem]
+
+
+class DbProfileEndpointItem(BaseModel):
+    endpoint: str
+    requests: int
+    queries: int
+    db_ms_total: float
+    db_ms_avg: float
+    db_ms_max: float
+    total_ms_avg: float
+
+
+class SlowQueryItem(BaseModel):
+    ts: str
+    endpoint: Optional[str] = None
+    duration_ms: float
+    statement: str
+    plan: Optional[str] = Field(None, description="EXPLAIN (ANALYZE, BUFFERS) output, when sampled")
+
+
+class DbProfileResponse(BaseModel):
+    slow_query_ms: float
+    explain_sample_rate: float
+    endpoints: List[DbProfileEndpointItem]
+    slow_queries: List[SlowQueryItem]
+
+
+class LoadControlEndpointItem(BaseModel):
+    endpoint: str
+    max_concurrent: int
+    max_queue: int
+    inflight: int = Field(..., description="Distinct queries executing or queued right now")
+    waiting: int = Field(..., description="Executions queued for a concurrency slot")
+    requests: int
+    executions: int = Field(..., description="Backend queries actually run")
+    coalesced: int = Field(..., description="Requests that shared an identical in-flight query")
+    shed: int = Field(..., description="Requests rejected with 503 because the queue was full")
+    timeouts: int = Field(..., description="Requests rejected with 503 after waiting API_QUEUE_TIMEOUT")
+
+
+class LoadControlResponse(BaseModel):
+    endpoints: List[LoadControlEndpointItem]
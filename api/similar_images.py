@@ -0,0 +1,81 @@
+"""
+In-process similar-image search over the embeddings written by src/yolo_detect.py.
+
+The embedding file is memory-mapped (read-only: the API never repairs or
+writes the store) and the IVF index (src/image_index.py) is kept in memory. New embeddings are picked up without a restart: the store is
+re-checked at most every IMAGE_INDEX_REFRESH_SECONDS and any new rows are added
+to the index incrementally (the detection stage retrains it when needed).
+"""
+import os
+import threading
+import time
+
+from src.image_index import ANN_NPROBE, EMBED_DIR, EmbeddingStore, IVFIndex
+
+IMAGE_INDEX_REFRESH_SECONDS = float(os.getenv("IMAGE_INDEX_REFRESH_SECONDS", "30"))
+
+
+class SimilarImageIndex:
+    def __init__(self, directory=EMBED_DIR, refresh_seconds: float = IMAGE_INDEX_REFRESH_SECONDS):
+        self.dir = directory
+        self.refresh_seconds = refresh_seconds
+        self._lock = threading.Lock()
+        self._checked_at = float("-inf")
+        self._store: EmbeddingStore | None = None
+        self._vectors = None
+        self._index: IVFIndex | None = None
+        self._signature = None
+
+    def _files_signature(self):
+        paths = [self.dir / "keys.jsonl", self.dir / "ivf.npz"]
+        return tuple((p.stat().st_size, p.stat().st_mtime_ns) if p.exists() else None for p in paths)
+
+    def refresh(self):
+        """Reload the store if its files changed; add rows the saved index does not cover yet."""
+        with self._lock:
+            if time.monotonic() - self._checked_at < self.refresh_seconds:
+                return
+            self._checked_at = time.monotonic()
+
+            signature = self._files_signature()
+            if signature == self._signature:
+                return
+
+            store = EmbeddingStore(self.dir, read_only=True)
+            vectors = store.vectors()
+            index_path = self.dir / "ivf.npz"
+            index = IVFIndex.load(index_path) if index_path.exists() else IVFIndex()
+            if len(index) > len(store):
+                index = IVFIndex.train(vectors)
+            index.add(vectors)
+
+            self._store, self._vectors, self._index = store, vectors, index
+            self._signature = signature
+
+    def similar(self, channel_name: str, message_id: int, k: int, nprobe: int = ANN_NPROBE):
+        """
+        Top-k images most similar to the image of (channel_name, message_id), excluding itself.
+        Returns None if that image has no embedding, else (channel_name, message_id, image_path, score) rows.
+        """
+        self.refresh()
+        store, vectors, index = self._store, self._vectors, self._index
+        if store is None:
+            return None
+
+        row = store.rows_by_key.get((channel_name, message_id))
+        if row is None:
+            return None
+
+        rows, scores = index.search(vectors, vectors[row], k + 1, nprobe=nprobe)
+        out = []
+        for r, score in zip(rows.tolist(), scores.tolist()):
+            if r == row:
+                continue
+            key = store.keys[r]
+            if key is None:
+                continue
+            out.append((key["channel_name"], key["message_id"], key["image_path"], score))
+        return out[:k]
+
+    def __len__(self):
+        return len(self._store) if self._store is not None else 0
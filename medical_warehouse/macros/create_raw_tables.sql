@@ -0,0 +1,17 @@
+{#
+    Raw tables that are filled by optional jobs (e.g. `python -m src.scraper --engagement`).
+    Created empty before every dbt invocation so their sources always exist;
+    same DDL as the job that writes them.
+#}
+{% macro create_raw_tables() %}
+    create schema if not exists raw;
+
+    create table if not exists raw.message_engagement_snapshots (
+        channel_name text not null,
+        message_id bigint not null,
+        polled_at timestamptz not null,
+        views integer not null,
+        forwards integer not null,
+        primary key (channel_name, message_id, polled_at)
+    );
+{% endmacro %}
@@ -1,3 +1,12 @@
+{{
+    config(
+        indexes=[
+            {'columns': ['channel_key'], 'unique': True},
+            {'columns': ['channel_name'], 'unique': True},
+        ]
+    )
+}}
+
 with base as (
     select
         channel_name,
@@ -1,3 +1,12 @@
+{{
+    config(
+        indexes=[
+            {'columns': ['date_key'], 'unique': True},
+            {'columns': ['full_date'], 'unique': True},
+        ]
+    )
+}}
+
 with dates as (
     select distinct
         message_ts::date as full_date
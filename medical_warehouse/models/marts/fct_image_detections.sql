@@ -1,5 +1,15 @@
+{{
+    config(
+        indexes=[
+            {'columns': ['channel_key', 'message_id']},
+            {'columns': ['date_key']},
+        ]
+    )
+}}
+
 with det as (
     select
+        channel_name,
         message_id,
         detected_class,
         confidence_score,
@@ -7,6 +17,11 @@ with det as (
     from {{ ref('stg_yolo_detections') }}
 ),
 
+ch as (
+    select channel_key, channel_name
+    from {{ ref('dim_channels') }}
+),
+
 msg as (
     select
         message_id,
@@ -16,6 +31,7 @@ msg as (
     from {{ ref('fct_messages') }}
 )
 
+-- message_id is only unique per channel: join on (channel_key, message_id)
 select
     det.message_id,
     msg.channel_key,
@@ -25,4 +41,7 @@ select
     det.image_category,
     msg.view_count
 from det
-join msg using (message_id)
+join ch on det.channel_name = ch.channel_name
+join msg
+  on msg.channel_key = ch.channel_key
+ and msg.message_id = det.message_id
@@ -0,0 +1,70 @@
+{{
+    config(
+        indexes=[
+            {'columns': ['channel_key', 'message_id', 'polled_at'], 'unique': True},
+            {'columns': ['date_key']},
+        ]
+    )
+}}
+
+-- One row per change of a message's counters (raw only stores changed values),
+-- i.e. the points of its engagement growth curve.
+with snap as (
+    select
+        channel_name,
+        message_id,
+        polled_at,
+        view_count,
+        forward_count
+    from {{ ref('stg_message_engagement') }}
+),
+
+msg as (
+    select channel_name, message_id, message_ts
+    from {{ ref('stg_telegram_messages') }}
+),
+
+ch as (
+    select channel_key, channel_name
+    from {{ ref('dim_channels') }}
+),
+
+dt as (
+    select date_key, full_date
+    from {{ ref('dim_dates') }}
+),
+
+points as (
+    select
+        snap.message_id,
+        ch.channel_key,
+        dt.date_key,
+        snap.polled_at,
+        extract(epoch from (snap.polled_at - msg.message_ts)) / 3600.0 as hours_since_post,
+        snap.view_count,
+        snap.forward_count,
+        lag(snap.polled_at) over w as prev_polled_at,
+        lag(snap.view_count) over w as prev_view_count,
+        lag(snap.forward_count) over w as prev_forward_count
+    from snap
+    join ch on snap.channel_name = ch.channel_name
+    join msg
+      on msg.channel_name = snap.channel_name
+     and msg.message_id = snap.message_id
+    join dt on msg.message_ts::date = dt.full_date
+    window w as (partition by snap.channel_name, snap.message_id order by snap.polled_at)
+)
+
+select
+    message_id,
+    channel_key,
+    date_key,
+    polled_at,
+    hours_since_post,
+    view_count,
+    forward_count,
+    view_count - prev_view_count as views_gained,
+    forward_count - prev_forward_count as forwards_gained,
+    (view_count - prev_view_count)
+        / nullif(extract(epoch from (polled_at - prev_polled_at)) / 3600.0, 0) as views_per_hour
+from points
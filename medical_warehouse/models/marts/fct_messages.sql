@@ -1,3 +1,13 @@
+{{
+    config(
+        indexes=[
+            {'columns': ['channel_key', 'message_id'], 'unique': True},
+            {'columns': ['date_key']},
+            {'columns': ['content_cluster_id']},
+        ]
+    )
+}}
+
 with msg as (
     select
         message_id,
@@ -7,7 +17,16 @@ with msg as (
         message_length,
         view_count,
         forward_count,
-        has_image
+        has_image,
+        content_cluster_id,
+        -- first post of each near-duplicate cluster; filter on it to collapse reposts
+        (
+            content_cluster_id is null
+            or row_number() over (
+                partition by content_cluster_id
+                order by message_ts, channel_name, message_id
+            ) = 1
+        ) as is_canonical
     from {{ ref('stg_telegram_messages') }}
 ),
 
@@ -29,7 +48,9 @@ select
     msg.message_length,
     msg.view_count,
     msg.forward_count,
-    msg.has_image
+    msg.has_image,
+    msg.content_cluster_id,
+    msg.is_canonical
 from msg
 join ch on msg.channel_name = ch.channel_name
 join dt on msg.full_date = dt.full_date
@@ -0,0 +1,42 @@
+{{
+    config(
+        indexes=[
+            {'columns': ['channel_key', 'message_id', 'product_name'], 'unique': True},
+            {'columns': ['product_name']},
+            {'columns': ['date_key', 'channel_key']},
+        ]
+    )
+}}
+
+with pm as (
+    select
+        channel_name,
+        message_id,
+        product_name,
+        category,
+        mention_count
+    from {{ ref('stg_product_mentions') }}
+),
+
+ch as (
+    select channel_key, channel_name
+    from {{ ref('dim_channels') }}
+),
+
+msg as (
+    select message_id, channel_key, date_key
+    from {{ ref('fct_messages') }}
+)
+
+select
+    pm.message_id,
+    msg.channel_key,
+    msg.date_key,
+    pm.product_name,
+    pm.category,
+    pm.mention_count
+from pm
+join ch on pm.channel_name = ch.channel_name
+join msg
+  on msg.channel_key = ch.channel_key
+ and msg.message_id = pm.message_id
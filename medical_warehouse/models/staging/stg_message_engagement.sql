@@ -0,0 +1,8 @@
+select
+    trim(lower(channel_name)) as channel_name,
+    message_id::bigint as message_id,
+    polled_at::timestamptz as polled_at,
+    views::bigint as view_count,
+    forwards::bigint as forward_count
+from {{ source('raw', 'message_engagement_snapshots') }}
+where message_id is not null
@@ -0,0 +1,8 @@
+select
+    trim(lower(channel_name)) as channel_name,
+    message_id::bigint as message_id,
+    product_name,
+    category,
+    mention_count::int as mention_count
+from {{ source('raw', 'product_mentions') }}
+where message_id is not null
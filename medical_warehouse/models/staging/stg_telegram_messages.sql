@@ -15,9 +15,40 @@ with src as (
     from {{ source('raw', 'telegram_messages') }}
     where message_id is not null
       and message_date is not null
+),
+
+-- raw is append-only (every load re-inserts the lake); keep one row per message,
+-- the latest snapshot (highest counters). message_id is only unique per channel.
+deduped as (
+    select
+        *,
+        row_number() over (
+            partition by channel_name, message_id
+            order by view_count desc, forward_count desc
+        ) as rn
+    from src
+),
+
+-- near-duplicate cluster from src/dedup_messages.py (null: not clustered / too short)
+clusters as (
+    select channel_name, message_id, content_cluster_id
+    from {{ source('raw', 'message_content_clusters') }}
 )
 
 select
-    *,
-    length(message_text) as message_length
-from src
+    d.message_id,
+    d.channel_name,
+    d.message_ts,
+    d.message_text,
+    d.has_media,
+    d.image_path,
+    d.view_count,
+    d.forward_count,
+    d.has_image,
+    length(d.message_text) as message_length,
+    cl.content_cluster_id
+from deduped d
+left join clusters cl
+  on cl.channel_name = d.channel_name
+ and cl.message_id = d.message_id
+where d.rn = 1
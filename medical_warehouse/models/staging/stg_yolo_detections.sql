@@ -4,8 +4,13 @@ select
     message_id::bigint as message_id,
     image_path,
     detected_class,
+    class_id,
     confidence_score::numeric as confidence_score,
-    bbox_xyxy,
+    bbox_x1,
+    bbox_y1,
+    bbox_x2,
+    bbox_y2,
+    (bbox_x2 - bbox_x1) * (bbox_y2 - bbox_y1) as bbox_area,
     image_category
 from {{ source('raw', 'yolo_detections') }}
 where message_id is not null
@@ -0,0 +1,78 @@
+"""
+Side-by-side latency of the API query backends (Postgres vs embedded DuckDB).
+
+    python scripts/bench_api_backends.py                       # both backends, 50 runs per query
+    python scripts/bench_api_backends.py --backends duckdb --runs 200
+
+Calls the backend methods the endpoints use (no HTTP overhead), after one warm-up
+call each, and prints p50 / p95 / mean in milliseconds.
+"""
+import argparse
+import statistics
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from api.backends import BACKENDS, get_backend  # noqa: E402
+
+
+def timed(fn, runs: int) -> list[float]:
+    fn()  # warm-up
+    samples = []
+    for _ in range(runs):
+        t0 = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - t0) * 1000.0)
+    return samples
+
+
+def bench_backend(name: str, runs: int, query: str) -> dict[str, list[float]] | None:
+    try:
+        backend = get_backend(name)
+        t0 = time.perf_counter()
+        backend.startup()
+        print(f"[{name}] startup {(time.perf_counter() - t0) * 1000.0:.1f} ms")
+    except Exception as e:
+        print(f"[{name}] skipped: {e}")
+        return None
+
+    try:
+        rows, _ = backend.visual_content()
+        channel = rows[0][0] if rows else "unknown"
+        cases = {
+            "top_products(10)": lambda: backend.top_products(10),
+            f"channel_activity({channel})": lambda: backend.channel_activity(channel),
+            f"search_messages({query})": lambda: backend.search_messages(f"%{query}%", 20),
+            "visual_content()": lambda: backend.visual_content(),
+        }
+        return {case: timed(fn, runs) for case, fn in cases.items()}
+    finally:
+        backend.shutdown()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--backends", nargs="+", default=list(BACKENDS), choices=BACKENDS)
+    parser.add_argument("--runs", type=int, default=50)
+    parser.add_argument("--query", default="para", help="Search keyword")
+    args = parser.parse_args()
+
+    results = {}
+    for name in args.backends:
+        res = bench_backend(name, args.runs, args.query)
+        if res is not None:
+            results[name] = res
+
+    print(f"\n{'backend':<10}{'query':<40}{'p50 ms':>10}{'p95 ms':>10}{'mean ms':>10}")
+    for name, cases in results.items():
+        for case, samples in cases.items():
+            samples = sorted(samples)
+            p95 = samples[min(len(samples) - 1, int(len(samples) * 0.95))]
+            print(f"{name:<10}{case:<40}{statistics.median(samples):>10.2f}{p95:>10.2f}"
+                  f"{statistics.fmean(samples):>10.2f}")
+
+
+if __name__ == "__main__":
+    main()
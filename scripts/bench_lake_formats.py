@@ -0,0 +1,145 @@
+"""
+Compare the JSON and Parquet raw-lake formats: bytes on disk and load time.
+
+    python scripts/bench_lake_formats.py                    # existing lake (converts to a temp dir)
+    python scripts/bench_lake_formats.py --synthetic 200000 # generated messages
+    python scripts/bench_lake_formats.py --db               # also time INSERTs into a temp table
+
+"Load" = everything src.load_raw_to_postgres does before talking to Postgres
+(read + decode + build row tuples); --db adds the execute_values round trips.
+"""
+import argparse
+import json
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from psycopg2.extras import execute_values  # noqa: E402
+
+from src.config import RAW_DATA_DIR  # noqa: E402
+from src.lake import require_pyarrow, write_parquet  # noqa: E402
+from src.load_raw_to_postgres import connect, iter_file_rows, load_file  # noqa: E402
+
+WORDS = ["paracetamol", "amoxicillin", "vitamin", "cream", "serum", "tablet", "syrup",
+         "price", "birr", "available", "delivery", "call", "pharmacy", "ዋጋ", "ይደውሉ"]
+
+
+def synthetic_lake(root: Path, n_messages: int, channels: int = 5, days: int = 30):
+    """Write n_messages as JSON partitions shaped like the scraper output."""
+    rnd = random.Random(42)
+    start = datetime.now(timezone.utc) - timedelta(days=days)
+    parts: dict[tuple[str, str], list] = {}
+
+    for i in range(n_messages):
+        ts = start + timedelta(seconds=rnd.randint(0, days * 86400))
+        channel = f"channel_{i % channels}"
+        has_media = rnd.random() < 0.4
+        parts.setdefault((ts.date().isoformat(), channel), []).append({
+            "message_id": i,
+            "channel_name": channel,
+            "message_date": ts.isoformat(),
+            "message_text": " ".join(rnd.choices(WORDS, k=rnd.randint(5, 60))),
+            "has_media": has_media,
+            "image_path": f"data/raw/images/{channel}/{i}.jpg" if has_media else None,
+            "views": rnd.randint(0, 50000),
+            "forwards": rnd.randint(0, 500),
+            "raw_meta": {"grouped_id": None, "reply_to_msg_id": None,
+                         "edit_date": None, "media_type": "MessageMediaPhoto" if has_media else None},
+        })
+
+    for (day, channel), records in parts.items():
+        out = root / day / f"{channel}.json"
+        out.parent.mkdir(parents=True, exist_ok=True)
+        with open(out, "w", encoding="utf-8") as f:
+            json.dump(records, f, ensure_ascii=False, indent=2)
+
+
+def convert_all(json_files: list[Path], root: Path, out_root: Path) -> list[Path]:
+    out_files = []
+    for fp in json_files:
+        data = load_file(fp)
+        if not data:
+            continue
+        out = out_root / fp.relative_to(root).with_suffix(".parquet")
+        write_parquet(out, data)
+        out_files.append(out)
+    return out_files
+
+
+def time_load(files: list[Path], repeat: int) -> tuple[float, int]:
+    best, rows = float("inf"), 0
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        rows = sum(len(batch) for fp in files for batch in iter_file_rows(fp))
+        best = min(best, time.perf_counter() - t0)
+    return best, rows
+
+
+def time_db_load(files: list[Path]) -> float:
+    conn = connect()
+    try:
+        with conn.cursor() as cur:
+            cur.execute("CREATE TEMP TABLE bench_messages (LIKE raw.telegram_messages)")
+            t0 = time.perf_counter()
+            for fp in files:
+                for values in iter_file_rows(fp):
+                    execute_values(
+                        cur,
+                        "INSERT INTO bench_messages (message_id, channel_name, message_date, message_text, "
+                        "has_media, image_path, views, forwards, raw) VALUES %s",
+                        values, page_size=2000,
+                    )
+            elapsed = time.perf_counter() - t0
+        conn.rollback()
+        return elapsed
+    finally:
+        conn.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--synthetic", type=int, default=0, help="Generate N messages instead of using the lake")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--db", action="store_true", help="Also time inserts into a temp table")
+    args = parser.parse_args()
+
+    require_pyarrow()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        if args.synthetic:
+            root = tmp / "json"
+            synthetic_lake(root, args.synthetic)
+        else:
+            root = Path(RAW_DATA_DIR) / "telegram_messages"
+
+        json_files = sorted(root.rglob("*.json"))
+        if not json_files:
+            print(f"No JSON files under {root}")
+            return
+
+        parquet_files = convert_all(json_files, root, tmp / "parquet")
+
+        json_bytes = sum(fp.stat().st_size for fp in json_files)
+        parquet_bytes = sum(fp.stat().st_size for fp in parquet_files)
+        # Both formats go through the loader's own iter_file_rows()
+        json_s, json_rows = time_load(json_files, args.repeat)
+        parquet_s, parquet_rows = time_load(parquet_files, args.repeat)
+
+        print(f"{'format':<10}{'files':>8}{'rows':>12}{'bytes':>16}{'load s':>10}{'rows/s':>14}")
+        print(f"{'json':<10}{len(json_files):>8}{json_rows:>12,}{json_bytes:>16,}{json_s:>10.3f}{json_rows / json_s:>14,.0f}")
+        print(f"{'parquet':<10}{len(parquet_files):>8}{parquet_rows:>12,}{parquet_bytes:>16,}{parquet_s:>10.3f}{parquet_rows / parquet_s:>14,.0f}")
+        print(f"\nParquet is {json_bytes / parquet_bytes:.1f}x smaller and loads {json_s / parquet_s:.1f}x faster")
+
+        if args.db:
+            print(f"DB insert (json):    {time_db_load(json_files):.3f}s")
+            print(f"DB insert (parquet): {time_db_load(parquet_files):.3f}s")
+
+
+if __name__ == "__main__":
+    main()
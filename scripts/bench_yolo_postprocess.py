@@ -0,0 +1,120 @@
+"""
+Per-image cost of turning YOLO results into detection rows: the old per-box loop
+(.item() calls and a "x1,y1,x2,y2" string per box) vs src.yolo_detect.detection_rows
+(one tensor -> NumPy copy per image, typed class id / bbox columns).
+
+    python scripts/bench_yolo_postprocess.py                        # 2000 images, 0-30 boxes each
+    python scripts/bench_yolo_postprocess.py --images 500 --max-boxes 100 --device cuda
+
+Uses synthetic result tensors wrapped in ultralytics' Boxes, so no model or
+images are needed. Inference itself is not timed.
+"""
+import argparse
+import statistics
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+import torch  # noqa: E402
+from ultralytics.engine.results import Boxes  # noqa: E402
+
+from src.yolo_detect import classify_image, detection_rows  # noqa: E402
+
+NAMES = {i: f"class_{i}" for i in range(80)}
+NAMES.update({0: "person", 39: "bottle", 41: "cup", 45: "bowl"})
+SCALE = (1.6, 1.6)  # 640px copy of a 1024px original
+
+
+def legacy_rows(boxes, names: dict, scale: tuple[float, float], prefix: list) -> list[list]:
+    """The pre-vectorization Detector.detect post-processing, verbatim."""
+    sx, sy = scale
+    if boxes is None or len(boxes) == 0:
+        return [prefix + [None, None, None, classify_image(set())]]
+
+    detected_labels_for_category = set()
+    for b in boxes:
+        cls_id = int(b.cls.item())
+        label = names.get(cls_id, str(cls_id))
+        detected_labels_for_category.add(label)
+
+    image_category = classify_image(detected_labels_for_category)
+
+    rows = []
+    for b in boxes:
+        cls_id = int(b.cls.item())
+        conf = float(b.conf.item())
+        label = names.get(cls_id, str(cls_id))
+        x1, y1, x2, y2 = b.xyxy.squeeze().tolist()
+        xyxy = [x1 * sx, y1 * sy, x2 * sx, y2 * sy]
+        bbox_str = ",".join([f"{x:.2f}" for x in xyxy])
+        rows.append(prefix + [label, conf, bbox_str, image_category])
+    return rows
+
+
+def synthetic_results(n_images: int, max_boxes: int, device: str, seed: int = 0) -> list[Boxes]:
+    """(n, 6) x1, y1, x2, y2, conf, cls tensors shaped like a 640px prediction."""
+    g = torch.Generator().manual_seed(seed)
+    results = []
+    for _ in range(n_images):
+        n = int(torch.randint(0, max_boxes + 1, (1,), generator=g))
+        xy = torch.rand(n, 2, generator=g) * 560
+        wh = torch.rand(n, 2, generator=g) * 80 + 4
+        conf = torch.rand(n, 1, generator=g) * 0.75 + 0.25
+        cls = torch.randint(0, 80, (n, 1), generator=g).float()
+        data = torch.cat([xy, xy + wh, conf, cls], dim=1).to(device)
+        results.append(Boxes(data, (640, 640)))
+    return results
+
+
+def time_per_image(fn, results: list, repeat: int) -> list[float]:
+    """Best-of-`repeat` microseconds per image for each image."""
+    prefix = ["2026-01-01T00:00:00", "channel", 1, "data/raw/images/channel/1.jpg"]
+    best = [float("inf")] * len(results)
+    for _ in range(repeat):
+        for i, boxes in enumerate(results):
+            t0 = time.perf_counter()
+            fn(boxes, NAMES, SCALE, prefix)
+            best[i] = min(best[i], (time.perf_counter() - t0) * 1e6)
+    return best
+
+
+def check_equivalent(results: list):
+    """Both paths report the same classes, confidences and (rounded) boxes."""
+    prefix = []
+    for boxes in results:
+        old = legacy_rows(boxes, NAMES, SCALE, prefix)
+        new = detection_rows(boxes, NAMES, SCALE, prefix)
+        assert len(old) == len(new)
+        for o, n in zip(old, new):
+            assert o[0] == n[0] and o[-1] == n[-1]
+            if o[2] is None:
+                continue
+            assert abs(o[1] - n[2]) < 1e-6
+            assert all(abs(float(a) - b) < 0.011 for a, b in zip(o[2].split(","), n[3:7]))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--images", type=int, default=2000)
+    parser.add_argument("--max-boxes", type=int, default=30)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--device", default="cpu")
+    args = parser.parse_args()
+
+    results = synthetic_results(args.images, args.max_boxes, args.device)
+    n_boxes = sum(len(b) for b in results)
+    check_equivalent(results)
+
+    print(f"{args.images} images, {n_boxes} boxes ({n_boxes / args.images:.1f}/image), device {args.device}")
+    print(f"{'':<22}{'mean us':>10}{'p50 us':>10}{'p95 us':>10}{'total ms':>10}")
+    for name, fn in (("legacy per-box loop", legacy_rows), ("detection_rows", detection_rows)):
+        us = sorted(time_per_image(fn, results, args.repeat))
+        p95 = us[min(len(us) - 1, int(len(us) * 0.95))]
+        print(f"{name:<22}{statistics.mean(us):>10.1f}{statistics.median(us):>10.1f}{p95:>10.1f}"
+              f"{sum(us) / 1000:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,146 @@
+"""
+Check that the API's selective queries and the star-schema joins are served by
+the mart indexes.
+
+    python scripts/check_query_plans.py
+
+Runs EXPLAIN (FORMAT JSON) for each checked endpoint query with sequential scans
+disabled (SET LOCAL enable_seqscan = off). With that setting the planner only
+falls back to a Seq Scan when no usable index exists, so the check does not
+depend on table sizes (tiny CI tables would otherwise always be seq-scanned).
+Exits non-zero if any listed relation is still read with a Seq Scan.
+"""
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from sqlalchemy import text  # noqa: E402
+
+from api.database import get_engine  # noqa: E402
+from api.backends.postgres import (  # noqa: E402
+    CHANNEL_ACTIVITY_SQL,
+    ENGAGEMENT_CURVE_SQL,
+    TOP_PRODUCTS_MV_SQL,
+    TOP_PRODUCTS_SQL,
+)
+
+# Star-schema joins with no endpoint of their own: image detections joined back to
+# their messages (the visual-content analyses), and date_key range lookups
+IMAGE_DETECTIONS_SQL = text("""
+    select det.detected_class, det.image_category, m.view_count, m.has_image
+    from analytics.fct_image_detections det
+    join analytics.dim_channels c on det.channel_key = c.channel_key
+    join analytics.fct_messages m
+      on m.channel_key = det.channel_key
+     and m.message_id = det.message_id
+    where c.channel_name = :channel_name;
+""")
+
+MESSAGES_DATE_RANGE_SQL = text("""
+    select d.full_date, count(*) as posts
+    from analytics.fct_messages m
+    join analytics.dim_dates d on m.date_key = d.date_key
+    where d.full_date between cast(:date_from as date) and cast(:date_to as date)
+    group by d.full_date;
+""")
+
+DETECTIONS_DATE_KEY_SQL = text("""
+    select det.image_category, count(*) as detections
+    from analytics.fct_image_detections det
+    join analytics.dim_dates d on det.date_key = d.date_key
+    where det.date_key between :date_from and :date_to
+    group by det.image_category;
+""")
+
+# (name, sql, params, relations that must be read through an index)
+CHECKS = [
+    (
+        "channel_activity",
+        CHANNEL_ACTIVITY_SQL,
+        {"channel_name": "__any_channel__"},
+        {"fct_messages", "dim_channels"},
+    ),
+    (
+        "top_products (materialized)",
+        TOP_PRODUCTS_MV_SQL,
+        {"limit": 10},
+        {"mv_top_products"},
+    ),
+    (
+        "top_products (channel + date filter)",
+        TOP_PRODUCTS_SQL,
+        {"limit": 10, "channel_name": "__any_channel__", "date_from": 20240101, "date_to": 20240131},
+        {"fct_product_mentions", "dim_channels"},
+    ),
+    (
+        "engagement_curve",
+        ENGAGEMENT_CURVE_SQL,
+        {"channel_name": "__any_channel__", "message_id": 1},
+        {"fct_message_engagement", "dim_channels"},
+    ),
+    (
+        "image_detections -> messages (channel)",
+        IMAGE_DETECTIONS_SQL,
+        {"channel_name": "__any_channel__"},
+        {"fct_image_detections", "fct_messages", "dim_channels"},
+    ),
+    (
+        "messages by full_date range",
+        MESSAGES_DATE_RANGE_SQL,
+        {"date_from": "2024-01-01", "date_to": "2024-01-31"},
+        {"fct_messages", "dim_dates"},
+    ),
+    (
+        "image_detections by date_key range",
+        DETECTIONS_DATE_KEY_SQL,
+        {"date_from": 20240101, "date_to": 20240131},
+        {"fct_image_detections", "dim_dates"},
+    ),
+]
+
+
+def seq_scans(plan: dict) -> set[str]:
+    """Relations read with a Seq Scan anywhere in an EXPLAIN JSON plan tree."""
+    found = set()
+    if plan.get("Node Type") == "Seq Scan":
+        found.add(plan.get("Relation Name"))
+    for child in plan.get("Plans", []):
+        found |= seq_scans(child)
+    return found
+
+
+def relation_exists(conn, name: str) -> bool:
+    return conn.execute(
+        text("select to_regclass(:name) is not null"), {"name": f"analytics.{name}"}
+    ).scalar()
+
+
+def main():
+    engine = get_engine()
+    failures = 0
+
+    with engine.connect() as conn:
+        for name, sql, params, indexed in CHECKS:
+            missing = [r for r in indexed if not relation_exists(conn, r)]
+            if missing:
+                print(f"SKIP {name}: missing {', '.join(missing)}")
+                continue
+
+            conn.execute(text("SET LOCAL enable_seqscan = off"))
+            plan = conn.execute(text("EXPLAIN (FORMAT JSON) " + sql.text), params).scalar()
+            conn.rollback()
+
+            bad = seq_scans(plan[0]["Plan"]) & indexed
+            if bad:
+                failures += 1
+                print(f"FAIL {name}: sequential scan on {', '.join(sorted(bad))}")
+            else:
+                print(f"OK   {name}")
+
+    if failures:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
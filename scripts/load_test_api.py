@@ -0,0 +1,91 @@
+"""
+Burst load test for the API's request coalescing and load shedding.
+
+    python -m uvicorn api.main:app --port 8000          # in another shell
+    python scripts/load_test_api.py --requests 200 --concurrency 50
+    python scripts/load_test_api.py --path "/api/search/messages?query=para" --distinct 40
+
+Fires a burst of requests (like a dashboard reload) from `--concurrency` threads,
+then prints the status codes, latency percentiles, and how many backend queries
+actually ran (from /debug/load): with coalescing, identical concurrent requests
+cost one execution; past the per-endpoint limit and queue, requests get 503 +
+Retry-After instead of piling onto Postgres.
+"""
+import argparse
+import json
+import statistics
+import time
+import urllib.error
+import urllib.request
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+
+def get(url: str, timeout: float) -> tuple[int, float, str | None]:
+    t0 = time.perf_counter()
+    try:
+        with urllib.request.urlopen(url, timeout=timeout) as resp:
+            resp.read()
+            status, retry_after = resp.status, None
+    except urllib.error.HTTPError as e:
+        status, retry_after = e.code, e.headers.get("Retry-After")
+    except (urllib.error.URLError, TimeoutError):
+        status, retry_after = 0, None
+    return status, (time.perf_counter() - t0) * 1000.0, retry_after
+
+
+def load_stats(base: str) -> dict[str, dict]:
+    with urllib.request.urlopen(f"{base}/debug/load", timeout=10) as resp:
+        return {e["endpoint"]: e for e in json.load(resp)["endpoints"]}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--base-url", default="http://127.0.0.1:8000")
+    parser.add_argument("--path", default="/api/reports/top-products?limit=10")
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument(
+        "--distinct", type=int, default=1,
+        help="Number of distinct query variants (adds &limit=N); 1 = all requests identical",
+    )
+    parser.add_argument("--timeout", type=float, default=30.0)
+    args = parser.parse_args()
+
+    base = args.base_url.rstrip("/")
+    sep = "&" if "?" in args.path else "?"
+    urls = [
+        f"{base}{args.path}" if args.distinct <= 1 else f"{base}{args.path}{sep}limit={1 + i % args.distinct}"
+        for i in range(args.requests)
+    ]
+
+    before = load_stats(base)
+    t0 = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+        results = list(pool.map(lambda u: get(u, args.timeout), urls))
+    wall = time.perf_counter() - t0
+    after = load_stats(base)
+
+    statuses = Counter(status for status, _, _ in results)
+    latencies = sorted(ms for status, ms, _ in results if status == 200)
+    retry_after = Counter(ra for status, _, ra in results if status == 503)
+
+    print(f"{args.requests} requests, {args.concurrency} concurrent, {args.distinct} distinct, {wall:.2f}s wall")
+    print("status codes:", dict(sorted(statuses.items())))
+    if latencies:
+        p95 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))]
+        print(f"200 latency ms: p50 {statistics.median(latencies):.1f}  p95 {p95:.1f}  max {latencies[-1]:.1f}")
+    if retry_after:
+        print("503 Retry-After:", dict(retry_after))
+
+    print(f"\n{'endpoint':<18}{'requests':>10}{'executions':>12}{'coalesced':>11}{'shed':>7}{'timeouts':>10}")
+    for name, a in after.items():
+        b = before.get(name, {})
+        d = {k: a[k] - b.get(k, 0) for k in ("requests", "executions", "coalesced", "shed", "timeouts")}
+        if d["requests"]:
+            print(f"{name:<18}{d['requests']:>10}{d['executions']:>12}{d['coalesced']:>11}"
+                  f"{d['shed']:>7}{d['timeouts']:>10}")
+
+
+if __name__ == "__main__":
+    main()
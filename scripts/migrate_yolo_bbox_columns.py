@@ -0,0 +1,71 @@
+"""
+One-time migration of raw.yolo_detections to typed box columns.
+
+    python scripts/migrate_yolo_bbox_columns.py
+
+Tables created before src/yolo_detect.py wrote typed detections store each box as
+"x1,y1,x2,y2" text in bbox_xyxy. In one transaction this adds class_id and
+bbox_x1..bbox_y2, parses the old boxes into them and drops bbox_xyxy. Run it once,
+before the next load and `dbt run`. The old stg_yolo_detections view selects
+bbox_xyxy, so it is dropped with the column; dbt re-creates it. Running it again,
+or on a table that never had bbox_xyxy, does nothing.
+"""
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from src.load_raw_to_postgres import connect  # noqa: E402
+
+HAS_LEGACY_COLUMN_SQL = """
+SELECT 1 FROM information_schema.columns
+WHERE table_schema = 'raw' AND table_name = 'yolo_detections' AND column_name = 'bbox_xyxy'
+"""
+
+MIGRATE_SQL = [
+    """
+    ALTER TABLE raw.yolo_detections
+      ADD COLUMN IF NOT EXISTS class_id INTEGER,
+      ADD COLUMN IF NOT EXISTS bbox_x1 REAL,
+      ADD COLUMN IF NOT EXISTS bbox_y1 REAL,
+      ADD COLUMN IF NOT EXISTS bbox_x2 REAL,
+      ADD COLUMN IF NOT EXISTS bbox_y2 REAL
+    """,
+    """
+    UPDATE raw.yolo_detections
+    SET bbox_x1 = split_part(bbox_xyxy, ',', 1)::real,
+        bbox_y1 = split_part(bbox_xyxy, ',', 2)::real,
+        bbox_x2 = split_part(bbox_xyxy, ',', 3)::real,
+        bbox_y2 = split_part(bbox_xyxy, ',', 4)::real
+    WHERE bbox_xyxy IS NOT NULL AND bbox_x1 IS NULL
+    """,
+    "ALTER TABLE raw.yolo_detections DROP COLUMN bbox_xyxy CASCADE",
+]
+
+
+def main():
+    conn = connect()
+    conn.autocommit = False
+    try:
+        with conn.cursor() as cur:
+            cur.execute(HAS_LEGACY_COLUMN_SQL)
+            if cur.fetchone() is None:
+                print("raw.yolo_detections has no bbox_xyxy column, nothing to migrate")
+                return
+
+            migrated = 0
+            for sql in MIGRATE_SQL:
+                cur.execute(sql)
+                if sql.lstrip().startswith("UPDATE"):
+                    migrated = cur.rowcount
+        conn.commit()
+        print(f"✅ Parsed {migrated} bbox_xyxy boxes into bbox_x1..bbox_y2 and dropped bbox_xyxy")
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -4,14 +4,23 @@ $ErrorActionPreference = "Stop"
 Write-Host "1) Load raw telegram JSON to Postgres..."
 python -m src.load_raw_to_postgres
 
-Write-Host "2) Run YOLO detection..."
-python src/yolo_detect.py
+Write-Host "2) Cluster near-duplicate messages..."
+python -m src.dedup_messages
 
-Write-Host "3) Load YOLO results to Postgres..."
+Write-Host "3) Extract product mentions..."
+python -m src.extract_products
+
+Write-Host "4) Run YOLO detection..."
+python -m src.yolo_detect
+
+Write-Host "5) Load YOLO results to Postgres..."
 python src/load_yolo_to_postgres.py
 
-Write-Host "4) dbt build (run + test)..."
+Write-Host "6) dbt build (run + test)..."
 dbt build --project-dir medical_warehouse --profiles-dir medical_warehouse
 
-Write-Host "5) Start API..."
+Write-Host "7) Refresh dashboard materialized views..."
+python -m src.refresh_views
+
+Write-Host "8) Start API..."
 python -m uvicorn api.main:app --host 127.0.0.1 --port 8000
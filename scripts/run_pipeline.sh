@@ -2,8 +2,12 @@
 set -e
 
 python -m src.scraper
+python -m src.scraper --engagement --once
 python -m src.load_raw_to_postgres
+python -m src.dedup_messages
+python -m src.extract_products
 
 dbt deps --project-dir medical_warehouse
 dbt run --project-dir medical_warehouse
+python -m src.refresh_views
 dbt test --project-dir medical_warehouse
@@ -0,0 +1,77 @@
+from collections import deque
+
+
+class Automaton:
+    """
+    Aho-Corasick multi-pattern matcher.
+
+    Matching walks the text once, so the cost is linear in text length plus the
+    number of matches, independent of how many patterns the dictionary holds.
+
+    Usage:
+        ac = Automaton()
+        ac.add("paracetamol", value)
+        ac.build()
+        for start, end, value in ac.iter_matches(text):
+            ...
+    """
+
+    def __init__(self):
+        self._goto: list[dict[str, int]] = [{}]
+        self._fail: list[int] = [0]
+        # (pattern length, value) pairs ending at each state (incl. via fail links)
+        self._out: list[list[tuple[int, object]]] = [[]]
+        self._built = False
+
+    def add(self, pattern: str, value):
+        if not pattern:
+            raise ValueError("Empty pattern")
+        if self._built:
+            raise RuntimeError("Cannot add patterns after build()")
+
+        state = 0
+        for ch in pattern:
+            nxt = self._goto[state].get(ch)
+            if nxt is None:
+                nxt = len(self._goto)
+                self._goto[state][ch] = nxt
+                self._goto.append({})
+                self._fail.append(0)
+                self._out.append([])
+            state = nxt
+        self._out[state].append((len(pattern), value))
+
+    def build(self):
+        """Compute failure links breadth-first and merge outputs along them."""
+        queue = deque(self._goto[0].values())
+
+        while queue:
+            state = queue.popleft()
+            for ch, nxt in self._goto[state].items():
+                queue.append(nxt)
+
+                f = self._fail[state]
+                while f and ch not in self._goto[f]:
+                    f = self._fail[f]
+                fail = self._goto[f].get(ch, 0)
+                self._fail[nxt] = fail if fail != nxt else 0
+                self._out[nxt] = self._out[nxt] + self._out[self._fail[nxt]]
+
+        self._built = True
+
+    def __len__(self):
+        return len(self._goto)
+
+    def iter_matches(self, text: str):
+        """Yield (start, end, value) for every pattern occurrence (overlaps included)."""
+        if not self._built:
+            raise RuntimeError("Call build() before matching")
+
+        goto, fail, out = self._goto, self._fail, self._out
+        state = 0
+        for i, ch in enumerate(text):
+            while state and ch not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(ch, 0)
+            for length, value in out[state]:
+                yield i - length + 1, i + 1, value
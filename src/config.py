@@ -10,8 +10,16 @@ CHANNELS = os.getenv("CHANNELS", "").split(",")
 SCRAPE_DAYS_BACK = int(os.getenv("SCRAPE_DAYS_BACK", "30"))
 
 RAW_DATA_DIR = os.getenv("RAW_DATA_DIR", "data/raw")
+PROCESSED_DATA_DIR = os.getenv("PROCESSED_DATA_DIR", "data/processed")
 LOG_DIR = os.getenv("LOG_DIR", "logs")
 
+# -------------------
+# Media normalization config
+# -------------------
+MEDIA_WORKERS = int(os.getenv("MEDIA_WORKERS", "4"))
+YOLO_IMGSZ = int(os.getenv("YOLO_IMGSZ", "640"))
+THUMB_SIZE = int(os.getenv("THUMB_SIZE", "256"))
+
 # -------------------
 # PostgreSQL config
 # -------------------
@@ -0,0 +1,80 @@
+"""
+One-shot conversion of the JSON data lake history to Parquet partitions.
+
+    python -m src.convert_lake               # write {channel}.parquet next to each {channel}.json
+    python -m src.convert_lake --delete-json # ...and remove the JSON file once converted
+
+The loader prefers the Parquet file when both exist, so conversion is safe to
+run before deleting anything.
+"""
+import argparse
+from pathlib import Path
+
+from src.config import RAW_DATA_DIR
+from src.lake import require_pyarrow, write_parquet
+from src.load_raw_to_postgres import load_file
+
+
+def convert_file(fp: Path, delete_json: bool = False) -> tuple[int, int, int] | None:
+    """Convert one partition. Returns (rows, json_bytes, parquet_bytes) or None if skipped."""
+    data = load_file(fp)
+    if not data:
+        return None
+
+    out = fp.with_suffix(".parquet")
+    write_parquet(out, data)
+
+    json_bytes = fp.stat().st_size
+    parquet_bytes = out.stat().st_size
+    if delete_json:
+        fp.unlink()
+    return len(data), json_bytes, parquet_bytes
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Convert the JSON data lake to Parquet.")
+    parser.add_argument("--delete-json", action="store_true", help="Remove JSON files after conversion")
+    args = parser.parse_args()
+
+    require_pyarrow()
+
+    base = Path(RAW_DATA_DIR) / "telegram_messages"
+    if not base.exists():
+        raise FileNotFoundError(f"Missing raw lake folder: {base}")
+
+    files = sorted(base.rglob("*.json"))
+    if not files:
+        print("No JSON files found.")
+        return
+
+    rows_total = json_total = parquet_total = 0
+    converted = skipped = 0
+
+    for fp in files:
+        # Skip salvage copies written by src/repair.py
+        if fp.name.endswith("_repaired.json"):
+            continue
+
+        result = convert_file(fp, delete_json=args.delete_json)
+        if result is None:
+            skipped += 1
+            continue
+
+        rows, json_bytes, parquet_bytes = result
+        rows_total += rows
+        json_total += json_bytes
+        parquet_total += parquet_bytes
+        converted += 1
+        print(f"{fp} -> {fp.with_suffix('.parquet')} | rows: {rows}")
+
+    print("\n✅ CONVERSION COMPLETE")
+    print(f"Files converted: {converted}")
+    print(f"Files skipped: {skipped}")
+    print(f"Rows: {rows_total}")
+    if parquet_total:
+        print(f"JSON bytes: {json_total:,} | Parquet bytes: {parquet_total:,} "
+              f"({json_total / parquet_total:.1f}x smaller)")
+
+
+if __name__ == "__main__":
+    main()
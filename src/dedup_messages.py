@@ -0,0 +1,253 @@
+"""
+Near-duplicate message clustering (incremental MinHash LSH).
+
+Vendors cross-post the same advert to many channels and repost it daily. This
+stage assigns every raw message a content_cluster_id shared by its near-duplicates
+(estimated Jaccard similarity of normalized text >= DEDUP_THRESHOLD), so the marts
+and /api/search/messages can collapse them.
+
+Run after load_raw_to_postgres and before dbt:
+
+    python -m src.dedup_messages              # only messages not clustered yet
+    python -m src.dedup_messages --rebuild    # drop the index and recluster everything
+
+The LSH index is persisted in Postgres (raw.content_lsh_buckets + one representative
+signature per cluster in raw.content_clusters). Each run hashes only new messages and
+looks up their band keys against the stored buckets, so cost grows with the number
+of new messages, not with the size of the history. Batches commit as they go: an
+interrupted run resumes where it stopped.
+
+Messages whose normalized text is shorter than DEDUP_MIN_CHARS get a NULL cluster.
+"""
+import argparse
+import os
+
+import numpy as np
+from psycopg2.extras import execute_values
+
+from src.load_raw_to_postgres import connect
+from src.minhash import LSHIndex, MinHasher, normalize_text
+
+DEDUP_THRESHOLD = float(os.getenv("DEDUP_THRESHOLD", "0.8"))
+DEDUP_MIN_CHARS = int(os.getenv("DEDUP_MIN_CHARS", "20"))
+DEDUP_BATCH_SIZE = int(os.getenv("DEDUP_BATCH_SIZE", "5000"))
+
+# Changing these invalidates stored signatures and buckets (run with --rebuild)
+NUM_PERM = 128
+BANDS = 16
+ROWS = 8
+SHINGLE_SIZE = 5
+PARAMS = f"perm={NUM_PERM},bands={BANDS},rows={ROWS},k={SHINGLE_SIZE}"
+
+LOCK_ID = 72033  # pg_advisory_lock key: one dedup run at a time
+
+CREATE_SQL = """
+CREATE TABLE IF NOT EXISTS raw.message_content_clusters (
+  channel_name text NOT NULL,
+  message_id bigint NOT NULL,
+  content_cluster_id bigint,
+  PRIMARY KEY (channel_name, message_id)
+);
+CREATE INDEX IF NOT EXISTS message_content_clusters_cluster_idx
+  ON raw.message_content_clusters (content_cluster_id);
+
+CREATE TABLE IF NOT EXISTS raw.content_clusters (
+  content_cluster_id bigint PRIMARY KEY,
+  signature bytea NOT NULL,
+  first_channel_name text NOT NULL,
+  first_message_id bigint NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS raw.content_lsh_buckets (
+  band smallint NOT NULL,
+  bucket_key bigint NOT NULL,
+  content_cluster_id bigint NOT NULL,
+  PRIMARY KEY (band, bucket_key)
+);
+
+CREATE TABLE IF NOT EXISTS raw.content_dedup_state (
+  params text NOT NULL
+);
+"""
+
+REBUILD_SQL = """
+TRUNCATE raw.message_content_clusters, raw.content_clusters,
+         raw.content_lsh_buckets, raw.content_dedup_state
+"""
+
+# Messages not clustered yet (raw is append-only; keep the latest snapshot's text)
+NEW_MESSAGES_SQL = """
+SELECT m.channel_name, m.message_id, m.message_text
+FROM (
+  SELECT DISTINCT ON (trim(lower(channel_name)), message_id)
+    trim(lower(channel_name)) AS channel_name,
+    message_id,
+    coalesce(message_text, '') AS message_text,
+    message_date
+  FROM raw.telegram_messages
+  WHERE message_id IS NOT NULL
+    AND message_date IS NOT NULL
+  ORDER BY trim(lower(channel_name)), message_id, views DESC NULLS LAST
+) m
+LEFT JOIN raw.message_content_clusters c
+  ON c.channel_name = m.channel_name AND c.message_id = m.message_id
+WHERE c.message_id IS NULL
+ORDER BY m.message_date, m.channel_name, m.message_id
+"""
+
+FETCH_BUCKETS_SQL = """
+SELECT b.band, b.bucket_key, b.content_cluster_id
+FROM raw.content_lsh_buckets b
+JOIN unnest(%s::smallint[], %s::bigint[]) AS k(band, bucket_key)
+  ON b.band = k.band AND b.bucket_key = k.bucket_key
+"""
+
+FETCH_SIGNATURES_SQL = """
+SELECT content_cluster_id, signature
+FROM raw.content_clusters
+WHERE content_cluster_id = ANY(%s)
+"""
+
+
+def check_params(cur):
+    cur.execute("SELECT params FROM raw.content_dedup_state")
+    row = cur.fetchone()
+    if row is None:
+        cur.execute("INSERT INTO raw.content_dedup_state (params) VALUES (%s)", (PARAMS,))
+    elif row[0] != PARAMS:
+        raise RuntimeError(
+            f"Stored LSH index was built with {row[0]}, code uses {PARAMS}. "
+            "Run: python -m src.dedup_messages --rebuild"
+        )
+
+
+def cluster_batch(cur, hasher: MinHasher, index: LSHIndex, rows: list[tuple], next_id) -> list[tuple]:
+    """
+    Assign clusters to one batch of (channel_name, message_id, message_text) rows.
+    Loads only the buckets and representatives the batch can hit, then writes the
+    new ones back. Returns membership rows for raw.message_content_clusters.
+    """
+    index.clear()
+    hashed = []
+    for channel_name, message_id, text in rows:
+        norm = normalize_text(text)
+        sig = hasher.signature(norm) if len(norm) >= DEDUP_MIN_CHARS else None
+        hashed.append((channel_name, message_id, sig, index.band_keys(sig) if sig is not None else None))
+
+    bands, keys = [], []
+    for *_, sig_keys in hashed:
+        if sig_keys is not None:
+            bands.extend(range(BANDS))
+            keys.extend(sig_keys)
+    if keys:
+        cur.execute(FETCH_BUCKETS_SQL, (bands, keys))
+        for band, key, cid in cur.fetchall():
+            index.buckets[(band, key)] = cid
+
+        cids = list(set(index.buckets.values()))
+        if cids:
+            cur.execute(FETCH_SIGNATURES_SQL, (cids,))
+            for cid, sig in cur.fetchall():
+                index.representatives[cid] = np.frombuffer(bytes(sig), dtype=np.uint32)
+
+    members = []
+    firsts = {}
+    for channel_name, message_id, sig, sig_keys in hashed:
+        if sig is None:
+            members.append((channel_name, message_id, None))
+            continue
+        cid = index.assign(sig, sig_keys, next_id)
+        firsts.setdefault(cid, (channel_name, message_id))
+        members.append((channel_name, message_id, cid))
+
+    if index.new_clusters:
+        execute_values(
+            cur,
+            "INSERT INTO raw.content_clusters "
+            "(content_cluster_id, signature, first_channel_name, first_message_id) VALUES %s",
+            [(cid, sig.tobytes(), *firsts[cid]) for cid, sig in index.new_clusters],
+            page_size=5000,
+        )
+    if index.new_buckets:
+        execute_values(
+            cur,
+            "INSERT INTO raw.content_lsh_buckets (band, bucket_key, content_cluster_id) VALUES %s",
+            index.new_buckets,
+            page_size=5000,
+        )
+    execute_values(
+        cur,
+        "INSERT INTO raw.message_content_clusters (channel_name, message_id, content_cluster_id) VALUES %s",
+        members,
+        page_size=5000,
+    )
+    return members
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Cluster near-duplicate messages (MinHash LSH).")
+    parser.add_argument("--rebuild", action="store_true", help="Drop the index and recluster all messages")
+    args = parser.parse_args()
+
+    hasher = MinHasher(num_perm=NUM_PERM, shingle_size=SHINGLE_SIZE)
+    index = LSHIndex(bands=BANDS, rows=ROWS, threshold=DEDUP_THRESHOLD)
+
+    conn = connect()
+    conn.autocommit = False
+    messages = 0
+    clustered = 0
+    new_clusters = 0
+
+    try:
+        with conn.cursor() as cur:
+            cur.execute("SELECT pg_try_advisory_lock(%s)", (LOCK_ID,))
+            if not cur.fetchone()[0]:
+                raise RuntimeError("Another dedup run is in progress")
+
+            cur.execute(CREATE_SQL)
+            if args.rebuild:
+                cur.execute(REBUILD_SQL)
+            check_params(cur)
+            cur.execute("SELECT coalesce(max(content_cluster_id), 0) FROM raw.content_clusters")
+            last_id = cur.fetchone()[0]
+        conn.commit()
+
+        def next_id():
+            nonlocal last_id
+            last_id += 1
+            return last_id
+
+        # WITH HOLD keeps the cursor open across the per-batch commits
+        with conn.cursor(name="dedup_messages", withhold=True) as src, conn.cursor() as cur:
+            src.itersize = DEDUP_BATCH_SIZE
+            src.execute(NEW_MESSAGES_SQL)
+            conn.commit()
+            while True:
+                rows = src.fetchmany(DEDUP_BATCH_SIZE)
+                if not rows:
+                    break
+                first_new = last_id
+                members = cluster_batch(cur, hasher, index, rows, next_id)
+                conn.commit()
+
+                messages += len(rows)
+                clustered += sum(1 for m in members if m[2] is not None)
+                new_clusters += last_id - first_new
+                print(f"Clustered {messages} new messages")
+
+        print("\n✅ DEDUP COMPLETE")
+        print(f"New messages hashed: {messages}")
+        print(f"Assigned to clusters: {clustered} ({new_clusters} new clusters)")
+        print("Data inserted into: raw.message_content_clusters")
+
+    except Exception as e:
+        conn.rollback()
+        print("\n❌ DEDUP FAILED — rolled back the current batch.")
+        raise e
+
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,198 @@
+"""
+Load-time product/drug entity extraction.
+
+Matches the product dictionary (PRODUCT_DICTIONARY, default
+medical_warehouse/seeds/product_dictionary.csv: product_name, category, term) against
+every message_text with an Aho-Corasick automaton, in parallel over batches, and
+rebuilds raw.product_mentions (one row per message and product). dbt turns it
+into analytics.fct_product_mentions.
+
+    python -m src.extract_products
+"""
+import csv
+import os
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+from psycopg2.extras import execute_values
+
+from src.aho_corasick import Automaton
+from src.load_raw_to_postgres import connect
+
+PRODUCT_DICTIONARY = Path(
+    os.getenv("PRODUCT_DICTIONARY", "medical_warehouse/seeds/product_dictionary.csv")
+)
+EXTRACT_WORKERS = int(os.getenv("EXTRACT_WORKERS", str(os.cpu_count() or 2)))
+EXTRACT_BATCH_SIZE = int(os.getenv("EXTRACT_BATCH_SIZE", "5000"))
+
+CREATE_SQL = """
+CREATE TABLE IF NOT EXISTS raw.product_mentions (
+  channel_name text NOT NULL,
+  message_id bigint NOT NULL,
+  message_date timestamptz,
+  product_name text NOT NULL,
+  category text,
+  mention_count int NOT NULL,
+  PRIMARY KEY (channel_name, message_id, product_name)
+)
+"""
+
+# One row per channel message (raw is append-only; keep the latest snapshot)
+SELECT_SQL = """
+SELECT DISTINCT ON (trim(lower(channel_name)), message_id)
+  trim(lower(channel_name)) AS channel_name,
+  message_id,
+  message_date,
+  coalesce(message_text, '') AS message_text
+FROM raw.telegram_messages
+WHERE message_id IS NOT NULL
+  AND message_date IS NOT NULL
+  AND coalesce(message_text, '') <> ''
+ORDER BY trim(lower(channel_name)), message_id, views DESC NULLS LAST
+"""
+
+INSERT_SQL = """
+INSERT INTO raw.product_mentions (
+  channel_name, message_id, message_date, product_name, category, mention_count
+) VALUES %s
+"""
+
+
+def load_dictionary(path: Path = PRODUCT_DICTIONARY) -> list[tuple[str, str, str]]:
+    """Read (term, product_name, category) rows; terms are matched case-insensitively."""
+    if not path.exists():
+        raise FileNotFoundError(f"Missing product dictionary: {path}")
+
+    entries = []
+    with open(path, "r", encoding="utf-8") as f:
+        for r in csv.DictReader(f):
+            term = (r.get("term") or "").strip().lower()
+            product = (r.get("product_name") or "").strip().lower()
+            if term and product:
+                entries.append((term, product, (r.get("category") or "").strip() or None))
+    return entries
+
+
+def build_automaton(entries: list[tuple[str, str, str]]) -> Automaton:
+    ac = Automaton()
+    for term, product, category in entries:
+        # Latin terms must match whole words; Ethiopic spellings take affixes
+        # (e.g. ፓራሲታሞልን), so they may match inside a word.
+        ac.add(term, (product, category, term.isascii()))
+    ac.build()
+    return ac
+
+
+def find_products(ac: Automaton, text: str) -> dict[str, tuple[str, int]]:
+    """
+    Return {product_name: (category, count)} for one message.
+    Overlapping hits resolve leftmost-longest, so "amoxicillin clavulanate"
+    is not also counted as "amoxicillin".
+    """
+    text = text.lower()
+    hits = []
+    for start, end, (product, category, whole_word) in ac.iter_matches(text):
+        if whole_word and (
+            (start > 0 and text[start - 1].isalnum())
+            or (end < len(text) and text[end].isalnum())
+        ):
+            continue
+        hits.append((start, end, product, category))
+
+    found = {}
+    covered_until = -1
+    for start, end, product, category in sorted(hits, key=lambda h: (h[0], -(h[1] - h[0]))):
+        if start < covered_until:
+            continue
+        covered_until = end
+        _, count = found.get(product, (category, 0))
+        found[product] = (category, count + 1)
+    return found
+
+
+# ---------- worker process ----------
+
+_worker_ac: Automaton | None = None
+
+
+def _init_worker(dictionary_path: str):
+    global _worker_ac
+    _worker_ac = build_automaton(load_dictionary(Path(dictionary_path)))
+
+
+def extract_batch(rows: list[tuple]) -> list[tuple]:
+    """(channel_name, message_id, message_date, message_text) rows -> INSERT_SQL tuples."""
+    out = []
+    for channel_name, message_id, message_date, message_text in rows:
+        for product, (category, count) in find_products(_worker_ac, message_text).items():
+            out.append((channel_name, message_id, message_date, product, category, count))
+    return out
+
+
+def iter_extracted(batches, workers: int = EXTRACT_WORKERS, dictionary_path: Path = PRODUCT_DICTIONARY):
+    """
+    Run extract_batch over an iterable of batches in a process pool, keeping at
+    most 2 * workers batches in flight so memory stays bounded. Yields results in order.
+    """
+    with ProcessPoolExecutor(
+        max_workers=workers, initializer=_init_worker, initargs=(str(dictionary_path),)
+    ) as pool:
+        pending = []
+        for batch in batches:
+            pending.append(pool.submit(extract_batch, batch))
+            if len(pending) >= workers * 2:
+                yield pending.pop(0).result()
+        for fut in pending:
+            yield fut.result()
+
+
+def main():
+    entries = load_dictionary()
+    print(f"Loaded {len(entries)} dictionary terms from {PRODUCT_DICTIONARY}")
+
+    conn = connect()
+    conn.autocommit = False
+    messages = 0
+    mentions = 0
+
+    try:
+        with conn.cursor() as cur:
+            cur.execute(CREATE_SQL)
+            # Full rebuild in one transaction: readers keep the old rows until commit
+            cur.execute("TRUNCATE raw.product_mentions")
+
+        def batches():
+            nonlocal messages
+            with conn.cursor(name="product_messages") as src:
+                src.itersize = EXTRACT_BATCH_SIZE
+                src.execute(SELECT_SQL)
+                while True:
+                    rows = src.fetchmany(EXTRACT_BATCH_SIZE)
+                    if not rows:
+                        break
+                    messages += len(rows)
+                    yield rows
+
+        with conn.cursor() as cur:
+            for values in iter_extracted(batches()):
+                if values:
+                    execute_values(cur, INSERT_SQL, values, page_size=5000)
+                    mentions += len(values)
+
+        conn.commit()
+        print("\n✅ PRODUCT EXTRACTION COMPLETE")
+        print(f"Messages scanned: {messages}")
+        print(f"Product mentions: {mentions}")
+        print("Data inserted into: raw.product_mentions")
+
+    except Exception as e:
+        conn.rollback()
+        print("\n❌ PRODUCT EXTRACTION FAILED — rolled back transaction.")
+        raise e
+
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
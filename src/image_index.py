@@ -0,0 +1,326 @@
+"""
+Image embeddings and an approximate nearest-neighbor index over them.
+
+yolo_detect.py stores one L2-normalized embedding per image (pooled backbone
+features of the YOLO model) in an append-only EmbeddingStore:
+
+    data/processed/embeddings/
+        vectors.f16   float16 rows, read through np.memmap (never loaded whole)
+        keys.jsonl    one {"channel_name", "message_id", "image_path"} line per row
+        meta.json     {"dim", "model", "layer"}
+        ivf.npz       IVFIndex: k-means centroids + the centroid of every indexed row
+        .lock         writer lock (appends and repairs of a torn append)
+
+IVFIndex is an inverted-file index in NumPy: rows are bucketed by their nearest
+centroid, and a query scores only the rows of its `nprobe` nearest centroids.
+New rows are added by assigning them to the existing centroids (no retraining).
+Below IVF_MIN_ROWS rows the index stays flat (exact search over every row).
+"""
+import json
+import os
+from contextlib import contextmanager
+from pathlib import Path
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+import numpy as np
+
+from src.config import PROCESSED_DATA_DIR
+
+EMBED_DIR = Path(os.getenv("EMBED_DIR", str(Path(PROCESSED_DATA_DIR) / "embeddings")))
+ANN_NPROBE = int(os.getenv("ANN_NPROBE", "8"))
+IVF_MIN_ROWS = int(os.getenv("IVF_MIN_ROWS", "5000"))
+IVF_TRAIN_SAMPLE = 50_000
+
+
+class EmbeddingStore:
+    """
+    Append-only float16 embedding file plus its row keys (see module docstring).
+
+    Writers (yolo_detect.Detector, src.worker) append vectors first, then keys, and
+    repair a torn append under the store's lock file. Readers (the API) open the
+    store with read_only=True: they use the first min(keys, vectors) rows, ignore
+    a key line that is still being written and never touch the files.
+    """
+
+    def __init__(self, directory: Path = EMBED_DIR, read_only: bool = False):
+        self.dir = Path(directory)
+        self.read_only = read_only
+        self.vectors_path = self.dir / "vectors.f16"
+        self.keys_path = self.dir / "keys.jsonl"
+        self.meta_path = self.dir / "meta.json"
+        self.lock_path = self.dir / ".lock"
+        self.meta: dict = {}
+        self.keys: list[dict | None] = []
+        self.rows_by_key: dict[tuple[str, int], int] = {}
+        self._pending_keys: list[dict] = []
+        self._pending_vectors: list[np.ndarray] = []
+        self.open()
+
+    @contextmanager
+    def _lock(self):
+        """Exclusive writer lock (held while repairing or appending)."""
+        self.dir.mkdir(parents=True, exist_ok=True)
+        with open(self.lock_path, "a+b") as f:
+            if fcntl is not None:
+                fcntl.flock(f, fcntl.LOCK_EX)
+            else:
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+            try:
+                yield
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(f, fcntl.LOCK_UN)
+                else:
+                    f.seek(0)
+                    msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+
+    def _read_keys(self) -> tuple[list[dict | None], list[int]]:
+        """
+        Keys of the complete (newline-terminated) lines and the byte offset where each
+        line ends. A line that does not decode stays as a None row so that row numbers
+        keep matching the vectors file.
+        """
+        keys, ends = [], []
+        if not self.keys_path.exists():
+            return keys, ends
+
+        offset = 0
+        with open(self.keys_path, "rb") as f:
+            for line in f:
+                if not line.endswith(b"\n"):
+                    break  # last line of an append that is still running (or was interrupted)
+                offset += len(line)
+                try:
+                    keys.append(json.loads(line))
+                except json.JSONDecodeError:
+                    keys.append(None)
+                ends.append(offset)
+        return keys, ends
+
+    def _load(self, repair: bool):
+        try:
+            self.meta = json.loads(self.meta_path.read_text(encoding="utf-8")) or self.meta
+        except (FileNotFoundError, json.JSONDecodeError):
+            pass
+
+        keys, ends = self._read_keys()
+        row_bytes = self.dim * 2 if self.meta else 0
+        size = self.vectors_path.stat().st_size if row_bytes and self.vectors_path.exists() else 0
+        n = min(len(keys), size // row_bytes) if row_bytes else 0
+
+        # Vectors are appended before keys: drop rows whose key never got written,
+        # and key bytes past the last complete row
+        if repair:
+            if size != n * row_bytes:
+                with open(self.vectors_path, "r+b") as f:
+                    f.truncate(n * row_bytes)
+            keys_size = ends[n - 1] if n else 0
+            if self.keys_path.exists() and self.keys_path.stat().st_size != keys_size:
+                with open(self.keys_path, "r+b") as f:
+                    f.truncate(keys_size)
+
+        self.keys = keys[:n]
+        self.rows_by_key = {
+            (k["channel_name"], int(k["message_id"])): i for i, k in enumerate(self.keys) if k is not None
+        }
+
+    def open(self):
+        """(Re)read the store; a writer also repairs an interrupted append."""
+        if self.read_only or not self.dir.exists():
+            self._load(repair=False)
+            return
+        with self._lock():
+            self._load(repair=True)
+
+    @property
+    def dim(self) -> int:
+        return int(self.meta["dim"])
+
+    def __len__(self):
+        return len(self.keys)
+
+    def __contains__(self, key: tuple[str, int]):
+        return key in self.rows_by_key
+
+    def vectors(self) -> np.ndarray:
+        """Read-only (n, dim) float16 memmap of all stored rows."""
+        if not self.keys:
+            return np.empty((0, self.meta.get("dim", 0)), dtype=np.float16)
+        return np.memmap(self.vectors_path, dtype=np.float16, mode="r", shape=(len(self.keys), self.dim))
+
+    def add(self, channel_name: str, message_id: int, image_path: str, vector: np.ndarray, **meta):
+        """Buffer one embedding; call flush() to append it. `meta` (model, layer) is fixed by the first add."""
+        if self.read_only:
+            raise RuntimeError(f"Embedding store {self.dir} is open read-only")
+        if not self.meta:
+            self.meta = {"dim": int(vector.shape[0]), **meta}
+        elif vector.shape[0] != self.dim:
+            raise ValueError(f"Embedding dim {vector.shape[0]} != store dim {self.dim} ({self.dir})")
+
+        key = {"channel_name": channel_name, "message_id": int(message_id), "image_path": image_path}
+        self.rows_by_key[(channel_name, int(message_id))] = len(self.keys) + len(self._pending_keys)
+        self._pending_keys.append(key)
+        self._pending_vectors.append(vector.astype(np.float16))
+
+    def flush(self) -> int:
+        """Append buffered embeddings. Returns the number of rows written."""
+        if not self._pending_keys:
+            return 0
+
+        with self._lock():
+            # Pick up (and repair) rows appended since open(), e.g. by another writer
+            self._load(repair=True)
+            if not self.meta_path.exists():
+                tmp = self.meta_path.with_suffix(".tmp")
+                tmp.write_text(json.dumps(self.meta), encoding="utf-8")
+                os.replace(tmp, self.meta_path)
+
+            with open(self.vectors_path, "ab") as f:
+                f.write(np.stack(self._pending_vectors).tobytes())
+            with open(self.keys_path, "a", encoding="utf-8") as f:
+                f.write("".join(json.dumps(key) + "\n" for key in self._pending_keys))
+
+        for key in self._pending_keys:
+            self.rows_by_key[(key["channel_name"], key["message_id"])] = len(self.keys)
+            self.keys.append(key)
+        written = len(self._pending_keys)
+        self._pending_keys.clear()
+        self._pending_vectors.clear()
+        return written
+
+
+def _nearest_centroids(x: np.ndarray, centroids: np.ndarray) -> np.ndarray:
+    return (x @ centroids.T).argmax(axis=1)
+
+
+def train_centroids(vectors: np.ndarray, nlist: int, iters: int = 20, seed: int = 0) -> np.ndarray:
+    """Spherical k-means on a sample of the rows (cosine similarity on unit vectors)."""
+    rng = np.random.default_rng(seed)
+    n = vectors.shape[0]
+    sample = np.asarray(vectors[np.sort(rng.choice(n, size=min(n, IVF_TRAIN_SAMPLE), replace=False))], dtype=np.float32)
+    centroids = sample[rng.choice(len(sample), size=nlist, replace=False)].copy()
+
+    for _ in range(iters):
+        assign = _nearest_centroids(sample, centroids)
+        for c in range(nlist):
+            members = sample[assign == c]
+            if len(members):
+                centroids[c] = members.sum(axis=0)
+            else:  # re-seed empty clusters
+                centroids[c] = sample[rng.integers(len(sample))]
+        centroids /= np.linalg.norm(centroids, axis=1, keepdims=True) + 1e-12
+    return centroids
+
+
+class IVFIndex:
+    """Inverted-file ANN index over an EmbeddingStore's rows (see module docstring)."""
+
+    def __init__(self, centroids: np.ndarray | None = None, assign: np.ndarray | None = None, trained_rows: int = 0):
+        self.centroids = centroids
+        self.assign = assign if assign is not None else np.empty(0, dtype=np.int32)
+        self.trained_rows = trained_rows
+        self._lists: list[np.ndarray] = []
+        self._rebuild_lists()
+
+    def __len__(self):
+        return len(self.assign)
+
+    @property
+    def is_flat(self) -> bool:
+        return self.centroids is None
+
+    def _rebuild_lists(self):
+        if self.is_flat:
+            self._lists = []
+            return
+        order = np.argsort(self.assign, kind="stable")
+        bounds = np.searchsorted(self.assign[order], np.arange(len(self.centroids) + 1))
+        self._lists = [order[bounds[c]:bounds[c + 1]] for c in range(len(self.centroids))]
+
+    @classmethod
+    def train(cls, vectors: np.ndarray, nlist: int | None = None) -> "IVFIndex":
+        n = vectors.shape[0]
+        if n < IVF_MIN_ROWS:
+            return cls(None, np.zeros(n, dtype=np.int32))
+        nlist = nlist or int(np.clip(4 * np.sqrt(n), 16, 4096))
+        index = cls(train_centroids(vectors, nlist), trained_rows=n)
+        index.add(vectors)
+        return index
+
+    def add(self, vectors: np.ndarray):
+        """Index rows len(self) .. len(vectors) - 1 (rows already indexed are skipped)."""
+        start = len(self.assign)
+        if vectors.shape[0] <= start:
+            return
+        if self.is_flat:
+            self.assign = np.zeros(vectors.shape[0], dtype=np.int32)
+            return
+
+        new_assign = np.concatenate([
+            _nearest_centroids(np.asarray(vectors[i:i + 65536], dtype=np.float32), self.centroids)
+            for i in range(start, vectors.shape[0], 65536)
+        ]).astype(np.int32)
+        self.assign = np.concatenate([self.assign, new_assign])
+        for c in np.unique(new_assign):
+            self._lists[c] = np.concatenate([self._lists[c], start + np.flatnonzero(new_assign == c)])
+
+    def search(self, vectors: np.ndarray, query: np.ndarray, k: int, nprobe: int = ANN_NPROBE):
+        """Top-k (row ids, cosine scores) for one unit query vector."""
+        q = np.asarray(query, dtype=np.float32)
+        if self.is_flat:
+            rows = np.arange(len(self.assign))
+        else:
+            probes = np.argsort(-(self.centroids @ q))[:nprobe]
+            rows = np.sort(np.concatenate([self._lists[c] for c in probes]))
+        if rows.size == 0:
+            return rows, np.empty(0, dtype=np.float32)
+
+        scores = np.asarray(vectors[rows], dtype=np.float32) @ q
+        top = np.argpartition(-scores, min(k, rows.size) - 1)[:k] if rows.size > k else np.arange(rows.size)
+        top = top[np.argsort(-scores[top])]
+        return rows[top], scores[top]
+
+    def save(self, path: Path):
+        tmp = path.with_suffix(".tmp.npz")
+        np.savez(
+            tmp,
+            centroids=self.centroids if self.centroids is not None else np.empty((0, 0), dtype=np.float32),
+            assign=self.assign,
+            trained_rows=np.int64(self.trained_rows),
+        )
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path: Path) -> "IVFIndex":
+        with np.load(path) as data:
+            centroids = data["centroids"]
+            return cls(centroids if centroids.size else None, data["assign"], int(data["trained_rows"]))
+
+
+def update_index(store: EmbeddingStore, retrain: bool = False) -> IVFIndex:
+    """
+    Bring the persisted index up to date with the store: train it once the store
+    reaches IVF_MIN_ROWS, retrain when it has grown 4x since training (or when
+    `retrain`), otherwise just add the new rows to the existing centroids.
+    """
+    path = store.dir / "ivf.npz"
+    vectors = store.vectors()
+    index = IVFIndex.load(path) if path.exists() and not retrain else None
+
+    stale = index is None or len(index) > len(store) or (
+        len(store) >= IVF_MIN_ROWS and (index.is_flat or len(store) >= 4 * index.trained_rows)
+    )
+    if stale:
+        index = IVFIndex.train(vectors)
+    else:
+        index.add(vectors)
+
+    if len(store):
+        index.save(path)
+    return index
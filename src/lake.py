@@ -0,0 +1,128 @@
+"""
+Columnar (Parquet) format for the raw data lake.
+
+Partitions mirror the JSON lake:
+    data/raw/telegram_messages/{day}/{channel}.parquet
+
+Files are schema-typed (int64 ids/counters, UTC timestamps, dictionary-encoded
+channel names) and zstd-compressed. pyarrow is optional: it is only needed when
+LAKE_FORMAT=parquet or when Parquet partitions are present.
+"""
+import json
+from datetime import datetime
+from pathlib import Path
+
+try:
+    import numpy as np
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # optional dependency
+    np = None
+    pa = None
+    pq = None
+
+PARQUET_COMPRESSION = "zstd"
+
+# Column order matches the INSERT column list in src/load_raw_to_postgres.py
+MESSAGE_COLUMNS = [
+    "message_id",
+    "channel_name",
+    "message_date",
+    "message_text",
+    "has_media",
+    "image_path",
+    "views",
+    "forwards",
+    "raw_meta",
+]
+
+if pa is not None:
+    MESSAGE_SCHEMA = pa.schema([
+        pa.field("message_id", pa.int64()),
+        pa.field("channel_name", pa.dictionary(pa.int32(), pa.string())),
+        pa.field("message_date", pa.timestamp("us", tz="UTC")),
+        pa.field("message_text", pa.string()),
+        pa.field("has_media", pa.bool_()),
+        pa.field("image_path", pa.string()),
+        pa.field("views", pa.int64()),
+        pa.field("forwards", pa.int64()),
+        # Small, sparse metadata kept as a JSON string (loaded into the jsonb `raw` column)
+        pa.field("raw_meta", pa.string()),
+    ])
+else:
+    MESSAGE_SCHEMA = None
+
+
+def require_pyarrow():
+    if pa is None:
+        raise RuntimeError("Parquet lake format requires pyarrow. Run: pip install pyarrow")
+
+
+def _parse_dt(s: str | None):
+    if not s:
+        return None
+    return datetime.fromisoformat(s.replace("Z", "+00:00"))
+
+
+def records_to_table(records: list[dict]):
+    """Convert scraper records (see scraper.message_to_dict) into a typed Arrow table."""
+    require_pyarrow()
+
+    columns = {
+        "message_id": [r.get("message_id") for r in records],
+        "channel_name": [r.get("channel_name") for r in records],
+        "message_date": [_parse_dt(r.get("message_date")) for r in records],
+        "message_text": [r.get("message_text") for r in records],
+        "has_media": [r.get("has_media") for r in records],
+        "image_path": [r.get("image_path") for r in records],
+        "views": [r.get("views") for r in records],
+        "forwards": [r.get("forwards") for r in records],
+        "raw_meta": [json.dumps(r.get("raw_meta") or {}, ensure_ascii=False) for r in records],
+    }
+    return pa.Table.from_pydict(columns, schema=MESSAGE_SCHEMA)
+
+
+def write_parquet(path: Path, records: list[dict]):
+    """Write one day/channel partition atomically (temp file + rename)."""
+    require_pyarrow()
+    path.parent.mkdir(parents=True, exist_ok=True)
+
+    tmp = path.with_suffix(".parquet.tmp")
+    pq.write_table(records_to_table(records), tmp, compression=PARQUET_COMPRESSION)
+    tmp.replace(path)
+
+
+def _timestamps_to_iso(col) -> list:
+    """
+    Format a UTC timestamp column as ISO strings in one vectorized numpy call.
+    Postgres parses them on insert; building tz-aware datetime objects per row
+    (to_pylist) would otherwise dominate the load time.
+    """
+    values = np.datetime_as_string(col.to_numpy(zero_copy_only=False), unit="us", timezone="UTC").tolist()
+    if col.null_count:
+        for i, is_null in enumerate(col.is_null().to_pylist()):
+            if is_null:
+                values[i] = None
+    return values
+
+
+def iter_parquet_batches(path: Path, batch_size: int = 10_000):
+    """
+    Yield insert-ready row tuples one record batch at a time.
+    The file is memory-mapped and each column is converted in one vectorized call,
+    instead of decoding and walking a dict per message as the JSON path does.
+    """
+    require_pyarrow()
+    pf = pq.ParquetFile(path, memory_map=True)
+
+    for batch in pf.iter_batches(batch_size=batch_size, columns=MESSAGE_COLUMNS):
+        cols = []
+        for name in MESSAGE_COLUMNS:
+            col = batch.column(name)
+            if pa.types.is_dictionary(col.type):
+                col = col.dictionary_decode()
+            elif pa.types.is_timestamp(col.type):
+                cols.append(_timestamps_to_iso(col))
+                continue
+            cols.append(col.to_pylist())
+        yield list(zip(*cols))
@@ -4,6 +4,7 @@ from datetime import datetime
 import psycopg2
 from psycopg2.extras import execute_values
 
+from src.lake import iter_parquet_batches
 from src.config import (
     RAW_DATA_DIR,
     POSTGRES_HOST,
@@ -30,11 +31,18 @@ def parse_iso_dt(s: str | None):
 
 
 def collect_files():
-    """Collect all JSON files from the raw data lake telegram_messages folder."""
+    """
+    Collect all partition files from the raw data lake telegram_messages folder.
+    A partition may exist as JSON and/or Parquet (after src.convert_lake);
+    the Parquet file wins so a partition is never loaded twice.
+    """
     base = Path(RAW_DATA_DIR) / "telegram_messages"
     if not base.exists():
         raise FileNotFoundError(f"Missing raw lake folder: {base}")
-    return sorted(base.rglob("*.json"))
+
+    files = {fp.with_suffix(""): fp for fp in base.rglob("*.json")}
+    files.update({fp.with_suffix(""): fp for fp in base.rglob("*.parquet")})
+    return sorted(files.values())
 
 
 def load_file(path: Path):
@@ -51,6 +59,36 @@ def load_file(path: Path):
         return None
 
 
+def json_rows(data: list[dict]) -> list[tuple]:
+    """Convert decoded JSON records into INSERT_SQL row tuples."""
+    return [
+        (
+            r.get("message_id"),
+            r.get("channel_name"),
+            parse_iso_dt(r.get("message_date")),
+            r.get("message_text"),
+            r.get("has_media"),
+            r.get("image_path"),
+            r.get("views"),
+            r.get("forwards"),
+            # The scraper writes this metadata under "raw_meta"
+            json.dumps(r.get("raw_meta") or r.get("raw") or {}),
+        )
+        for r in data
+    ]
+
+
+def iter_file_rows(path: Path):
+    """Yield batches of INSERT_SQL row tuples from a JSON or Parquet partition."""
+    if path.suffix == ".parquet":
+        yield from iter_parquet_batches(path)
+        return
+
+    data = load_file(path)
+    if data:
+        yield json_rows(data)
+
+
 def connect():
     """Create a PostgreSQL connection."""
     if not POSTGRES_PASSWORD:
@@ -68,10 +106,10 @@ def connect():
 def main():
     files = collect_files()
     if not files:
-        print("No JSON files found in data lake. Run scraper first.")
+        print("No JSON/Parquet files found in data lake. Run scraper first.")
         return
 
-    print(f"Found {len(files)} JSON files. Loading into raw.telegram_messages...")
+    print(f"Found {len(files)} lake files. Loading into raw.telegram_messages...")
 
     conn = connect()
     conn.autocommit = False
@@ -82,38 +120,19 @@ def main():
     try:
         with conn.cursor() as cur:
             for fp in files:
-                data = load_file(fp)
-
-                if data is None:
-                    files_skipped += 1
-                    continue
+                loaded = 0
+                for values in iter_file_rows(fp):
+                    execute_values(cur, INSERT_SQL, values, page_size=2000)
+                    loaded += len(values)
 
-                # Some files might be empty lists
-                if not data:
+                # Corrupted JSON or empty partitions
+                if not loaded:
                     files_skipped += 1
                     continue
 
-                values = []
-                for r in data:
-                    values.append(
-                        (
-                            r.get("message_id"),
-                            r.get("channel_name"),
-                            parse_iso_dt(r.get("message_date")),
-                            r.get("message_text"),
-                            r.get("has_media"),
-                            r.get("image_path"),
-                            r.get("views"),
-                            r.get("forwards"),
-                            json.dumps(r.get("raw", {})),
-                        )
-                    )
-
-                execute_values(cur, INSERT_SQL, values, page_size=2000)
-
-                rows_total += len(values)
+                rows_total += loaded
                 files_loaded += 1
-                print(f"Loaded {len(values)} rows from {fp}")
+                print(f"Loaded {loaded} rows from {fp}")
 
         conn.commit()
         print("\n✅ LOAD COMPLETE")
@@ -15,16 +15,62 @@ POSTGRES_PASSWORD = os.getenv("POSTGRES_PASSWORD")
 
 CSV_PATH = Path("data/processed/yolo/yolo_detections.csv")
 
+# Boxes are typed columns in original-image pixels. Tables that still have the old
+# "x1,y1,x2,y2" text column: run scripts/migrate_yolo_bbox_columns.py once.
+CREATE_SQL = """
+CREATE TABLE IF NOT EXISTS raw.yolo_detections (
+  run_ts TEXT,
+  channel_name TEXT,
+  message_id BIGINT,
+  image_path TEXT,
+  detected_class TEXT,
+  class_id INTEGER,
+  confidence_score REAL,
+  bbox_x1 REAL,
+  bbox_y1 REAL,
+  bbox_x2 REAL,
+  bbox_y2 REAL,
+  image_category TEXT
+)
+"""
+
 INSERT_SQL = """
 INSERT INTO raw.yolo_detections (
   run_ts, channel_name, message_id, image_path,
-  detected_class, confidence_score, bbox_xyxy, image_category
+  detected_class, class_id, confidence_score,
+  bbox_x1, bbox_y1, bbox_x2, bbox_y2, image_category
 ) VALUES %s
 """
 
+BBOX_COLUMNS = ("bbox_x1", "bbox_y1", "bbox_x2", "bbox_y2")
+
+
+def db_row(r: dict) -> tuple:
+    """One detection record keyed by src/yolo_detect.py CSV_COLUMNS (CSV strings or Detector values) -> INSERT_SQL tuple."""
+    return (
+        r["run_ts"] or None,
+        (r["channel_name"] or "").strip().lower() or None,
+        int(r["message_id"]) if r["message_id"] else None,
+        r["image_path"] or None,
+        r["detected_class"] or None,
+        int(r["class_id"]) if r["class_id"] not in (None, "") else None,
+        float(r["confidence_score"]) if r["confidence_score"] else None,
+        *(float(r[c]) if r[c] not in (None, "") else None for c in BBOX_COLUMNS),
+        r["image_category"] or None
+    )
+
+
+def ensure_table(cur):
+    cur.execute(CREATE_SQL)
+
+
+def insert_detections(cur, rows: list[tuple]):
+    execute_values(cur, INSERT_SQL, rows, page_size=5000)
+
+
 def main():
     if not CSV_PATH.exists():
-        raise FileNotFoundError(f"Missing {CSV_PATH}. Run: python src/yolo_detect.py")
+        raise FileNotFoundError(f"Missing {CSV_PATH}. Run: python -m src.yolo_detect")
 
     if not POSTGRES_PASSWORD:
         raise ValueError("Missing POSTGRES_PASSWORD. Ensure .env exists and is correct.")
@@ -42,20 +88,12 @@ def main():
     with open(CSV_PATH, "r", encoding="utf-8") as f:
         reader = csv.DictReader(f)
         for r in reader:
-            rows.append((
-                r["run_ts"] or None,
-                (r["channel_name"] or "").strip().lower() or None,
-                int(r["message_id"]) if r["message_id"] else None,
-                r["image_path"] or None,
-                r["detected_class"] or None,
-                float(r["confidence_score"]) if r["confidence_score"] else None,
-                r["bbox_xyxy"] or None,
-                r["image_category"] or None
-            ))
+            rows.append(db_row(r))
 
     try:
         with conn.cursor() as cur:
-            execute_values(cur, INSERT_SQL, rows, page_size=5000)
+            ensure_table(cur)
+            insert_detections(cur, rows)
         conn.commit()
         print(f"✅ Loaded {len(rows)} rows into raw.yolo_detections")
     except Exception:
@@ -64,5 +102,6 @@ def main():
     finally:
         conn.close()
 
+
 if __name__ == "__main__":
     main()
@@ -0,0 +1,170 @@
+import hashlib
+import io
+import json
+import tempfile
+from concurrent.futures import Future, ThreadPoolExecutor
+from pathlib import Path
+
+from PIL import Image, ImageOps
+
+from src.config import MEDIA_WORKERS, PROCESSED_DATA_DIR, THUMB_SIZE, YOLO_IMGSZ
+
+# Outputs (relative to PROCESSED_DATA_DIR):
+#   images/detect/{channel}/{message_id}.jpg  -> longest side == YOLO_IMGSZ (detector-ready)
+#   images/thumbs/{channel}/{message_id}.jpg  -> longest side == THUMB_SIZE (API/UI)
+#   images/index.jsonl                        -> one JSON line per processed image (last line wins)
+MEDIA_DIR = Path(PROCESSED_DATA_DIR) / "images"
+DETECT_DIR = MEDIA_DIR / "detect"
+THUMBS_DIR = MEDIA_DIR / "thumbs"
+INDEX_FILE = MEDIA_DIR / "index.jsonl"
+
+# EXIF orientations that rotate by 90/270 degrees (width and height swap)
+_TRANSPOSED_ORIENTATIONS = {5, 6, 7, 8}
+
+
+def atomic_write_bytes(path: Path, data: bytes):
+    """Write bytes via a temp file in the same folder, then rename into place."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+
+    with tempfile.NamedTemporaryFile(delete=False, dir=path.parent, suffix=".tmp") as tmp:
+        tmp.write(data)
+
+    Path(tmp.name).replace(path)
+
+
+def _encode_jpeg(im: Image.Image, quality: int) -> bytes:
+    buf = io.BytesIO()
+    im.save(buf, format="JPEG", quality=quality, optimize=True)
+    return buf.getvalue()
+
+
+def normalize_image(
+    data: bytes,
+    channel_name: str,
+    message_id: int,
+    image_path: str,
+    imgsz: int = YOLO_IMGSZ,
+    thumb_size: int = THUMB_SIZE,
+) -> dict:
+    """
+    Decode one downloaded photo once and write the detector-ready copy + thumbnail.
+    Returns the index entry for the image.
+    """
+    with Image.open(io.BytesIO(data)) as src:
+        width, height = src.size
+        if src.getexif().get(0x0112) in _TRANSPOSED_ORIENTATIONS:
+            width, height = height, width
+
+        # For JPEGs, let the decoder downscale by 1/2, 1/4 or 1/8 while decoding
+        src.draft("RGB", (imgsz, imgsz))
+        im = ImageOps.exif_transpose(src).convert("RGB")
+
+    # thumbnail() only ever shrinks and keeps the aspect ratio
+    im.thumbnail((imgsz, imgsz), Image.LANCZOS)
+    detect_bytes = _encode_jpeg(im, quality=90)
+
+    thumb = im.copy()
+    thumb.thumbnail((thumb_size, thumb_size), Image.LANCZOS)
+    thumb_bytes = _encode_jpeg(thumb, quality=80)
+
+    detect_path = DETECT_DIR / channel_name / f"{message_id}.jpg"
+    thumb_path = THUMBS_DIR / channel_name / f"{message_id}.jpg"
+    atomic_write_bytes(detect_path, detect_bytes)
+    atomic_write_bytes(thumb_path, thumb_bytes)
+
+    return {
+        "channel_name": channel_name,
+        "message_id": message_id,
+        "image_path": image_path,
+        "width": width,
+        "height": height,
+        "bytes": len(data),
+        "sha256": hashlib.sha256(data).hexdigest(),
+        "detect_path": str(detect_path),
+        "detect_width": im.width,
+        "detect_height": im.height,
+        "detect_bytes": len(detect_bytes),
+        "detect_sha256": hashlib.sha256(detect_bytes).hexdigest(),
+        "thumb_path": str(thumb_path),
+        "thumb_width": thumb.width,
+        "thumb_height": thumb.height,
+    }
+
+
+def load_index(index_file: Path = INDEX_FILE) -> dict[tuple[str, int], dict]:
+    """Read the media index as {(channel_name, message_id): entry}; later lines win."""
+    entries = {}
+    if not index_file.exists():
+        return entries
+
+    with open(index_file, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                e = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            entries[(e["channel_name"], int(e["message_id"]))] = e
+    return entries
+
+
+class MediaPipeline:
+    """
+    Worker pool that normalizes downloaded photos off the scraper's event loop.
+
+    Pillow releases the GIL while decoding/resizing, so threads give real
+    parallelism without copying image bytes into child processes.
+    Index entries are appended by the calling thread only (no write races).
+    """
+
+    def __init__(self, workers: int = MEDIA_WORKERS, logger=None):
+        self.workers = max(1, workers)
+        self.logger = logger
+        self._pool = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="media")
+        self._pending: list[Future] = []
+        self.processed = 0
+        self.failed = 0
+
+    def submit(self, data: bytes, channel_name: str, message_id: int, image_path: str):
+        # Bound memory held by queued downloads
+        if len(self._pending) >= self.workers * 4:
+            self._drain(keep=self.workers)
+
+        fut = self._pool.submit(normalize_image, data, channel_name, message_id, image_path)
+        fut.media_key = (channel_name, message_id)
+        self._pending.append(fut)
+
+    def _drain(self, keep: int = 0):
+        split = len(self._pending) - keep
+        done, self._pending = self._pending[:split], self._pending[split:]
+        entries = []
+        for fut in done:
+            try:
+                entries.append(fut.result())
+                self.processed += 1
+            except Exception as e:
+                self.failed += 1
+                if self.logger:
+                    self.logger.error(f"Failed to normalize image {fut.media_key}: {e}")
+
+        if entries:
+            INDEX_FILE.parent.mkdir(parents=True, exist_ok=True)
+            with open(INDEX_FILE, "a", encoding="utf-8") as f:
+                for e in entries:
+                    f.write(json.dumps(e, ensure_ascii=False) + "\n")
+
+    def flush(self):
+        """Wait for all queued images and append their index entries."""
+        self._drain(keep=0)
+
+    def close(self):
+        self.flush()
+        self._pool.shutdown(wait=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -0,0 +1,138 @@
+"""
+MinHash signatures and a banded LSH index for near-duplicate text detection.
+
+A message is reduced to its set of character shingles; the MinHash signature
+(num_perm 32-bit minimums) estimates the Jaccard similarity of two shingle sets
+as the fraction of equal positions. LSH splits each signature into `bands` bands
+of `rows` values: two messages become candidates when any band matches, so a new
+message only looks up `bands` buckets instead of comparing against every message.
+
+Signatures and band keys are deterministic (fixed seed, no Python hash()), so
+they can be persisted and compared across runs.
+"""
+import hashlib
+import re
+
+import numpy as np
+
+MERSENNE_PRIME = np.uint64((1 << 61) - 1)
+MAX_HASH = np.uint64((1 << 32) - 1)
+
+_URL_RE = re.compile(r"(https?://|www\.|t\.me/)\S+")
+_HANDLE_RE = re.compile(r"@\w+")
+_NON_WORD_RE = re.compile(r"[\W_]+")
+
+
+def normalize_text(text: str) -> str:
+    """Lowercase, drop links and @handles, collapse punctuation/emoji/whitespace."""
+    text = _URL_RE.sub(" ", (text or "").lower())
+    text = _HANDLE_RE.sub(" ", text)
+    return _NON_WORD_RE.sub(" ", text).strip()
+
+
+class MinHasher:
+    def __init__(self, num_perm: int = 128, shingle_size: int = 5, seed: int = 1):
+        self.num_perm = num_perm
+        self.shingle_size = shingle_size
+        rng = np.random.RandomState(seed)
+        # a, b < 2^32 and shingle hashes < 2^32, so a * x + b never overflows uint64
+        self._a = rng.randint(1, 1 << 32, size=num_perm, dtype=np.uint64)[:, None]
+        self._b = rng.randint(0, 1 << 32, size=num_perm, dtype=np.uint64)[:, None]
+
+    def shingle_hashes(self, text: str) -> np.ndarray:
+        """Distinct 32-bit hashes of the character k-grams (polynomial hash, vectorized)."""
+        codes = np.frombuffer(text.encode("utf-32-le"), dtype=np.uint32)
+        k = self.shingle_size
+        n = len(codes) - k + 1
+        if n <= 0:
+            return np.empty(0, dtype=np.uint32)
+
+        h = np.zeros(n, dtype=np.uint32)
+        with np.errstate(over="ignore"):
+            for j in range(k):
+                h = h * np.uint32(1000003) + codes[j:j + n]
+        return np.unique(h)
+
+    def signature(self, normalized_text: str) -> np.ndarray | None:
+        """uint32[num_perm] MinHash signature, or None if the text is shorter than one shingle."""
+        shingles = self.shingle_hashes(normalized_text).astype(np.uint64)
+        if shingles.size == 0:
+            return None
+        hv = (self._a * shingles[None, :] + self._b) % MERSENNE_PRIME & MAX_HASH
+        return hv.min(axis=1).astype(np.uint32)
+
+
+def similarity(a: np.ndarray, b: np.ndarray) -> float:
+    """Estimated Jaccard similarity of two signatures."""
+    return float(np.count_nonzero(a == b)) / len(a)
+
+
+class LSHIndex:
+    """
+    Banded LSH over MinHash signatures, clustering near-duplicates.
+
+    Each cluster keeps the signature of its first message (the representative);
+    a message joins the most similar candidate cluster whose representative is at
+    least `threshold` similar, otherwise it starts a new cluster. Every message's
+    band keys are added to the buckets (first cluster per bucket wins), so reposts
+    that drift slightly keep finding the cluster.
+
+    The index is plain dicts so callers can load just the buckets and
+    representatives a batch needs from persistent storage and write back
+    `new_buckets` / `new_clusters` afterwards.
+    """
+
+    def __init__(self, bands: int, rows: int, threshold: float):
+        self.bands = bands
+        self.rows = rows
+        self.threshold = threshold
+        self.buckets: dict[tuple[int, int], int] = {}
+        self.representatives: dict[int, np.ndarray] = {}
+        self.new_buckets: list[tuple[int, int, int]] = []
+        self.new_clusters: list[tuple[int, np.ndarray]] = []
+
+    def band_keys(self, sig: np.ndarray) -> list[int]:
+        """One signed 64-bit key per band (fits a Postgres bigint)."""
+        r = self.rows
+        return [
+            int.from_bytes(
+                hashlib.blake2b(sig[i * r:(i + 1) * r].tobytes(), digest_size=8).digest(),
+                "little",
+                signed=True,
+            )
+            for i in range(self.bands)
+        ]
+
+    def candidates(self, keys: list[int]) -> set[int]:
+        return {
+            cid for cid in (self.buckets.get((band, key)) for band, key in enumerate(keys))
+            if cid is not None
+        }
+
+    def assign(self, sig: np.ndarray, keys: list[int], new_cluster_id) -> int:
+        """Return the cluster id for a signature; `new_cluster_id()` allocates a fresh one."""
+        best_id, best_sim = None, self.threshold
+        for cid in self.candidates(keys):
+            rep = self.representatives.get(cid)
+            if rep is None:
+                continue
+            sim = similarity(sig, rep)
+            if sim >= best_sim:
+                best_id, best_sim = cid, sim
+
+        if best_id is None:
+            best_id = new_cluster_id()
+            self.representatives[best_id] = sig
+            self.new_clusters.append((best_id, sig))
+
+        for band, key in enumerate(keys):
+            if (band, key) not in self.buckets:
+                self.buckets[(band, key)] = best_id
+                self.new_buckets.append((band, key, best_id))
+        return best_id
+
+    def clear(self):
+        self.buckets.clear()
+        self.representatives.clear()
+        self.new_buckets.clear()
+        self.new_clusters.clear()
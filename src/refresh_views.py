@@ -0,0 +1,136 @@
+"""
+Maintain the precomputed dashboard reports as Postgres materialized views.
+
+Run after dbt:  python -m src.refresh_views
+
+- Every `dbt run` rebuilds the marts these views read from, and dbt drops the
+  old tables with CASCADE, which drops the views too. So in the pipeline the
+  views are always missing here and are created WITH DATA, with their indexes.
+  Until then the API computes the reports live (refreshed_at is null).
+- A view that still exists (this script run on its own, without dbt) is
+  refreshed with a plain REFRESH MATERIALIZED VIEW.
+- analytics.mv_refresh_log records when each view was last refreshed (the API
+  returns it as the report's freshness timestamp) and a hash of its definition;
+  a view whose SELECT changed in this file is dropped and recreated.
+"""
+import hashlib
+
+from src.load_raw_to_postgres import connect
+
+SCHEMA = "analytics"
+
+REFRESH_LOG_DDL = f"""
+CREATE TABLE IF NOT EXISTS {SCHEMA}.mv_refresh_log (
+  view_name text PRIMARY KEY,
+  refreshed_at timestamptz NOT NULL
+);
+ALTER TABLE {SCHEMA}.mv_refresh_log ADD COLUMN IF NOT EXISTS definition_md5 text;
+"""
+
+# view name -> (select sql, index ddl list)
+MATERIALIZED_VIEWS = {
+    "mv_visual_content": (
+        f"""
+        select
+            c.channel_name,
+            sum(case when m.has_image then 1 else 0 end) as posts_with_images,
+            count(*) as total_posts,
+            (sum(case when m.has_image then 1 else 0 end)::numeric / nullif(count(*),0))::float as image_rate
+        from {SCHEMA}.fct_messages m
+        join {SCHEMA}.dim_channels c on m.channel_key = c.channel_key
+        group by c.channel_name
+        """,
+        [
+            f"CREATE UNIQUE INDEX IF NOT EXISTS mv_visual_content_channel_uq "
+            f"ON {SCHEMA}.mv_visual_content (channel_name)",
+        ],
+    ),
+    "mv_top_products": (
+        f"""
+        select
+            product_name as term,
+            min(category) as category,
+            count(*) as mentions
+        from {SCHEMA}.fct_product_mentions
+        group by product_name
+        """,
+        [
+            f"CREATE UNIQUE INDEX IF NOT EXISTS mv_top_products_term_uq "
+            f"ON {SCHEMA}.mv_top_products (term)",
+            f"CREATE INDEX IF NOT EXISTS mv_top_products_mentions_idx "
+            f"ON {SCHEMA}.mv_top_products (mentions DESC)",
+        ],
+    ),
+}
+
+
+def built_definition(cur, name: str) -> str | None:
+    """Definition hash of the existing view, '' if it exists unlogged, None if missing."""
+    cur.execute(
+        "select 1 from pg_matviews where schemaname = %s and matviewname = %s",
+        (SCHEMA, name),
+    )
+    if cur.fetchone() is None:
+        return None
+
+    cur.execute(f"select definition_md5 from {SCHEMA}.mv_refresh_log where view_name = %s", (name,))
+    row = cur.fetchone()
+    return (row[0] or "") if row else ""
+
+
+def refresh_view(cur, name: str, select_sql: str, indexes: list[str]) -> str:
+    """Create the view if missing (or changed), otherwise refresh it. Returns the action taken."""
+    definition_md5 = hashlib.md5(select_sql.encode("utf-8")).hexdigest()
+    built = built_definition(cur, name)
+
+    if built == definition_md5:
+        cur.execute(f"REFRESH MATERIALIZED VIEW {SCHEMA}.{name}")
+        action = "refreshed"
+    else:
+        if built is not None:
+            cur.execute(f"DROP MATERIALIZED VIEW {SCHEMA}.{name}")
+        cur.execute(f"CREATE MATERIALIZED VIEW {SCHEMA}.{name} AS {select_sql} WITH DATA")
+        action = "created" if built is None else "recreated"
+
+    for ddl in indexes:
+        cur.execute(ddl)
+
+    cur.execute(f"ANALYZE {SCHEMA}.{name}")
+    cur.execute(
+        f"""
+        INSERT INTO {SCHEMA}.mv_refresh_log (view_name, refreshed_at, definition_md5)
+        VALUES (%s, now(), %s)
+        ON CONFLICT (view_name) DO UPDATE
+        SET refreshed_at = excluded.refreshed_at, definition_md5 = excluded.definition_md5
+        """,
+        (name, definition_md5),
+    )
+    return action
+
+
+def main():
+    conn = connect()
+    conn.autocommit = False
+
+    try:
+        with conn.cursor() as cur:
+            cur.execute(REFRESH_LOG_DDL)
+        conn.commit()
+
+        # One transaction per view: a failure leaves the other reports untouched
+        for name, (select_sql, indexes) in MATERIALIZED_VIEWS.items():
+            try:
+                with conn.cursor() as cur:
+                    action = refresh_view(cur, name, select_sql, indexes)
+                conn.commit()
+                print(f"✅ {SCHEMA}.{name} {action}")
+            except Exception:
+                conn.rollback()
+                print(f"❌ Failed to refresh {SCHEMA}.{name}")
+                raise
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
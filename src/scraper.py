@@ -1,15 +1,23 @@
+import argparse
+import asyncio
 import json
 import logging
 import re
+import time
 from datetime import datetime, timedelta, timezone
 from pathlib import Path
 
+from psycopg2.extras import execute_values
 from telethon import TelegramClient
 from telethon.tl.types import Message
 from dotenv import load_dotenv
 import os
 import tempfile
 
+from src.lake import require_pyarrow, write_parquet
+from src.load_raw_to_postgres import connect
+from src.media import MediaPipeline, atomic_write_bytes
+
 # Load environment variables
 load_dotenv()
 
@@ -26,6 +34,39 @@ SCRAPE_DAYS_BACK = int(os.getenv("SCRAPE_DAYS_BACK", "30"))
 RAW_DATA_DIR = Path(os.getenv("RAW_DATA_DIR", "data/raw"))
 LOG_DIR = Path(os.getenv("LOG_DIR", "logs"))
 
+# Raw lake partition format: "json" (default) or "parquet" (see src/lake.py)
+LAKE_FORMAT = os.getenv("LAKE_FORMAT", "json").strip().lower()
+
+# Write detector-ready copies + thumbnails while downloading (see src/media.py)
+MEDIA_NORMALIZE = os.getenv("MEDIA_NORMALIZE", "1") == "1"
+
+# Engagement polling (--engagement): re-read views/forwards of recent messages
+ENGAGEMENT_DAYS_BACK = int(os.getenv("ENGAGEMENT_DAYS_BACK", "7"))
+ENGAGEMENT_POLL_SECONDS = int(os.getenv("ENGAGEMENT_POLL_SECONDS", "900"))
+ENGAGEMENT_BATCH_SIZE = 100  # ids per get_messages request (Telegram's limit)
+# Changed snapshots are also written to the lake (read by the DuckDB API backend):
+# {ENGAGEMENT_LAKE_DIR}/{YYYY-MM-DD}/{channel}-{HHMMSS}.json, one file per poll and channel
+ENGAGEMENT_LAKE_DIR = RAW_DATA_DIR / "message_engagement"
+
+ENGAGEMENT_DDL = """
+CREATE TABLE IF NOT EXISTS raw.message_engagement_snapshots (
+  channel_name text NOT NULL,
+  message_id bigint NOT NULL,
+  polled_at timestamptz NOT NULL,
+  views integer NOT NULL,
+  forwards integer NOT NULL,
+  PRIMARY KEY (channel_name, message_id, polled_at)
+)
+"""
+
+# Last stored counters per message (served by the primary key index)
+LATEST_ENGAGEMENT_SQL = """
+SELECT DISTINCT ON (message_id) message_id, views, forwards
+FROM raw.message_engagement_snapshots
+WHERE channel_name = %s AND message_id >= %s
+ORDER BY message_id, polled_at DESC
+"""
+
 
 def slugify(name: str) -> str:
     name = name.lower().strip()
@@ -70,7 +111,7 @@ def message_to_dict(message, channel: str, image_path: str | None):
 
 
 
-async def scrape_channel(client, channel, start_date, logger):
+async def scrape_channel(client, channel, start_date, logger, media: MediaPipeline | None = None):
     channel_slug = slugify(channel)
     messages_by_day = {}
 
@@ -90,22 +131,37 @@ async def scrape_channel(client, channel, start_date, logger):
             img_dir = RAW_DATA_DIR / "images" / channel_slug
             img_dir.mkdir(parents=True, exist_ok=True)
             img_file = img_dir / f"{msg.id}.jpg"
-            await client.download_media(msg.photo, file=img_file)
+            data = await client.download_media(msg.photo, file=bytes)
+            atomic_write_bytes(img_file, data)
             image_path = str(img_file)
 
+            if media is not None:
+                media.submit(data, channel_slug, msg.id, image_path)
+
         record = message_to_dict(msg, channel_slug, image_path)
         messages_by_day.setdefault(day, []).append(record)
 
     for day, records in messages_by_day.items():
         out_dir = RAW_DATA_DIR / "telegram_messages" / day
         out_dir.mkdir(parents=True, exist_ok=True)
-        out_file = out_dir / f"{channel_slug}.json"
 
-        with open(out_file, "w", encoding="utf-8") as f:
-            json.dump(records, f, ensure_ascii=False, indent=2)
+        if LAKE_FORMAT == "parquet":
+            out_file = out_dir / f"{channel_slug}.parquet"
+            write_parquet(out_file, records)
+        else:
+            out_file = out_dir / f"{channel_slug}.json"
+            with open(out_file, "w", encoding="utf-8") as f:
+                json.dump(records, f, ensure_ascii=False, indent=2)
+
+        # This scrape supersedes the partition in the other format (loader prefers Parquet)
+        stale = out_file.with_suffix(".json" if LAKE_FORMAT == "parquet" else ".parquet")
+        stale.unlink(missing_ok=True)
 
         logger.info(f"Saved {len(records)} messages to {out_file}")
 
+    if media is not None:
+        media.flush()
+
 
 async def main():
     logger = setup_logger()
@@ -113,17 +169,140 @@ async def main():
     if not CHANNELS:
         raise ValueError("CHANNELS is empty. Check your .env file.")
 
+    if LAKE_FORMAT not in ("json", "parquet"):
+        raise ValueError(f"Unsupported LAKE_FORMAT: {LAKE_FORMAT} (use json or parquet)")
+    if LAKE_FORMAT == "parquet":
+        require_pyarrow()
+
     RAW_DATA_DIR.mkdir(parents=True, exist_ok=True)
 
     start_date = datetime.now(timezone.utc) - timedelta(days=SCRAPE_DAYS_BACK)
 
-    async with TelegramClient(SESSION_NAME, API_ID, API_HASH) as client:
-        for channel in CHANNELS:
-            try:
-                logger.info(f"Scraping channel: {channel}")
-                await scrape_channel(client, channel, start_date, logger)
-            except Exception as e:
-                logger.error(f"Error scraping {channel}: {e}")
+    media = MediaPipeline(logger=logger) if MEDIA_NORMALIZE else None
+
+    try:
+        async with TelegramClient(SESSION_NAME, API_ID, API_HASH) as client:
+            for channel in CHANNELS:
+                try:
+                    logger.info(f"Scraping channel: {channel}")
+                    await scrape_channel(client, channel, start_date, logger, media)
+                except Exception as e:
+                    logger.error(f"Error scraping {channel}: {e}")
+    finally:
+        if media is not None:
+            media.close()
+            logger.info(f"Normalized {media.processed} images ({media.failed} failed)")
+
+
+def changed_engagement(latest: dict[int, tuple[int, int]], messages, polled_at: datetime, channel: str) -> list[tuple]:
+    """
+    Snapshot rows only for messages whose (views, forwards) differ from the last
+    stored values (or that have none yet). Storage then grows with the number of
+    changes, not with polls x messages.
+    """
+    rows = []
+    for msg in messages:
+        # Deleted ids come back as None; service messages carry no view counter
+        if msg is None or msg.views is None:
+            continue
+        current = (msg.views or 0, msg.forwards or 0)
+        if latest.get(msg.id) != current:
+            rows.append((channel, msg.id, polled_at, *current))
+            latest[msg.id] = current
+    return rows
+
+
+async def poll_channel_engagement(client, channel, conn, logger) -> tuple[int, int]:
+    """
+    Re-poll views/forwards of the last ENGAGEMENT_DAYS_BACK days of one channel.
+    Channel message ids are sequential, so the window is an id range: two cheap
+    lookups find its bounds, then ids are fetched in batches with get_messages(ids=[...])
+    instead of walking the history. Returns (messages polled, snapshots written).
+    """
+    channel_slug = slugify(channel)
+    entity = await client.get_entity(channel)
+
+    newest = await client.get_messages(entity, limit=1)
+    if not newest:
+        return 0, 0
+    start_date = datetime.now(timezone.utc) - timedelta(days=ENGAGEMENT_DAYS_BACK)
+    # offset_date returns messages older than the date: the window starts right after it
+    before_window = await client.get_messages(entity, limit=1, offset_date=start_date)
+    first_id = before_window[0].id + 1 if before_window else 1
+    last_id = newest[0].id
+    if first_id > last_id:
+        return 0, 0
+
+    with conn.cursor() as cur:
+        cur.execute(LATEST_ENGAGEMENT_SQL, (channel_slug, first_id))
+        latest = {mid: (views, forwards) for mid, views, forwards in cur.fetchall()}
+
+    polled = 0
+    rows = []
+    ids = list(range(first_id, last_id + 1))
+    for i in range(0, len(ids), ENGAGEMENT_BATCH_SIZE):
+        batch = ids[i:i + ENGAGEMENT_BATCH_SIZE]
+        messages = await client.get_messages(entity, ids=batch)
+        polled_at = datetime.now(timezone.utc)
+        polled += sum(1 for m in messages if m is not None)
+        rows.extend(changed_engagement(latest, messages, polled_at, channel_slug))
+
+    if rows:
+        # Lake first: if the insert fails, the next poll writes the change again
+        polled_at = rows[-1][2]
+        safe_write_json(
+            ENGAGEMENT_LAKE_DIR / polled_at.strftime("%Y-%m-%d") / f"{channel_slug}-{polled_at.strftime('%H%M%S')}.json",
+            [
+                {"channel_name": ch, "message_id": mid, "polled_at": ts.isoformat(), "views": v, "forwards": f}
+                for ch, mid, ts, v, f in rows
+            ],
+        )
+        with conn.cursor() as cur:
+            execute_values(
+                cur,
+                "INSERT INTO raw.message_engagement_snapshots "
+                "(channel_name, message_id, polled_at, views, forwards) VALUES %s "
+                "ON CONFLICT DO NOTHING",
+                rows,
+                page_size=2000,
+            )
+    conn.commit()
+
+    logger.info(f"Engagement {channel}: polled {polled} messages (ids {first_id}-{last_id}), {len(rows)} changed")
+    return polled, len(rows)
+
+
+async def engagement_main(once: bool = False):
+    """Scraper mode: poll engagement of recent messages every ENGAGEMENT_POLL_SECONDS (or once)."""
+    logger = setup_logger()
+
+    if not CHANNELS:
+        raise ValueError("CHANNELS is empty. Check your .env file.")
+
+    conn = connect()
+    conn.autocommit = False
+    try:
+        with conn.cursor() as cur:
+            cur.execute(ENGAGEMENT_DDL)
+        conn.commit()
+
+        async with TelegramClient(SESSION_NAME, API_ID, API_HASH) as client:
+            while True:
+                started = time.monotonic()
+                for channel in CHANNELS:
+                    try:
+                        await poll_channel_engagement(client, channel, conn, logger)
+                    except Exception as e:
+                        conn.rollback()
+                        logger.error(f"Error polling engagement for {channel}: {e}")
+
+                if once:
+                    break
+                await asyncio.sleep(max(0.0, ENGAGEMENT_POLL_SECONDS - (time.monotonic() - started)))
+    finally:
+        conn.close()
+
+
 def safe_write_json(path: Path, data):
     path.parent.mkdir(parents=True, exist_ok=True)
 
@@ -140,5 +319,13 @@ def safe_write_json(path: Path, data):
 
 
 if __name__ == "__main__":
-    import asyncio
-    asyncio.run(main())
+    parser = argparse.ArgumentParser(description="Scrape Telegram channels into the raw data lake.")
+    parser.add_argument(
+        "--engagement",
+        action="store_true",
+        help="Instead of scraping, re-poll views/forwards of recent messages into raw.message_engagement_snapshots",
+    )
+    parser.add_argument("--once", action="store_true", help="With --engagement: poll once and exit")
+    args = parser.parse_args()
+
+    asyncio.run(engagement_main(once=args.once) if args.engagement else main())
@@ -0,0 +1,392 @@
+"""
+Long-running pipeline worker: process new lake files within seconds instead of daily.
+
+    python -m src.worker
+
+- Watches data/raw/telegram_messages (JSON/Parquet partitions) and data/raw/images.
+  Uses inotify through the optional watchdog package (pip install watchdog) and
+  falls back to polling every WORKER_POLL_SECONDS.
+- Changes are micro-batched: after the first change the worker collects more for
+  WORKER_BATCH_SECONDS, then runs load messages -> detect images -> load detections.
+  Files modified in the last WORKER_SETTLE_SECONDS are still being written and wait
+  for the next batch.
+- Every file version (path, size, mtime) is processed once: raw.worker_processed_files
+  is updated in the same transaction as the rows loaded from it, so a crash can
+  neither load a file twice nor skip it. A partition the scraper rewrites later is
+  a new version and is reloaded (raw is append-only; stg keeps one row per message).
+- The YOLO model, embedding store and DB connection stay warm across batches.
+- Every WORKER_TRANSFORM_SECONDS (0 = never) after new data, the downstream stages
+  run: dedup, product extraction, dbt run, materialized view refresh. The worker
+  wakes up for a due transform even when no further files arrive.
+- SIGINT/SIGTERM finish the current batch, then exit.
+"""
+import os
+import signal
+import subprocess
+import threading
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+import psycopg2
+from psycopg2.extras import execute_values
+
+try:
+    from watchdog.events import FileSystemEventHandler
+    from watchdog.observers import Observer
+except ImportError:  # optional dependency
+    FileSystemEventHandler = object
+    Observer = None
+
+from src.config import RAW_DATA_DIR
+from src.load_raw_to_postgres import INSERT_SQL, connect, iter_file_rows
+from src.load_yolo_to_postgres import db_row, ensure_table, insert_detections
+
+MESSAGES_DIR = Path(RAW_DATA_DIR) / "telegram_messages"
+IMAGES_DIR = Path(RAW_DATA_DIR) / "images"
+MESSAGE_SUFFIXES = {".json", ".parquet"}
+IMAGE_SUFFIXES = {".jpg", ".jpeg", ".png", ".webp"}
+
+WORKER_POLL_SECONDS = float(os.getenv("WORKER_POLL_SECONDS", "10"))
+WORKER_BATCH_SECONDS = float(os.getenv("WORKER_BATCH_SECONDS", "2"))
+WORKER_SETTLE_SECONDS = float(os.getenv("WORKER_SETTLE_SECONDS", "2"))
+WORKER_TRANSFORM_SECONDS = float(os.getenv("WORKER_TRANSFORM_SECONDS", "300"))
+
+TRANSFORM_COMMANDS = [
+    ["python", "-m", "src.dedup_messages"],
+    ["python", "-m", "src.extract_products"],
+    ["dbt", "run", "--project-dir", "medical_warehouse", "--profiles-dir", "medical_warehouse"],
+    ["python", "-m", "src.refresh_views"],
+]
+
+CREATE_STATE_SQL = """
+CREATE TABLE IF NOT EXISTS raw.worker_processed_files (
+  path text PRIMARY KEY,
+  size bigint NOT NULL,
+  mtime_ns bigint NOT NULL,
+  rows_loaded int NOT NULL,
+  processed_at timestamptz NOT NULL DEFAULT now()
+)
+"""
+
+MARK_PROCESSED_SQL = """
+INSERT INTO raw.worker_processed_files (path, size, mtime_ns, rows_loaded) VALUES %s
+ON CONFLICT (path) DO UPDATE
+SET size = excluded.size, mtime_ns = excluded.mtime_ns,
+    rows_loaded = excluded.rows_loaded, processed_at = now()
+"""
+
+
+def log(msg: str):
+    print(f"{datetime.now().strftime('%H:%M:%S')} | {msg}", flush=True)
+
+
+class LakeWatcher(FileSystemEventHandler):
+    """
+    Collects paths that may have changed. inotify events (watchdog) when available,
+    otherwise a background thread that re-lists the directories every poll interval.
+    The worker decides what actually needs processing.
+    """
+
+    def __init__(self, dirs: list[Path], poll_seconds: float = WORKER_POLL_SECONDS):
+        self.dirs = dirs
+        self.poll_seconds = poll_seconds
+        self._pending: set[Path] = set()
+        self._lock = threading.Lock()
+        self._changed = threading.Event()
+        self._stop = threading.Event()
+        self._observer = None
+        self._poller = None
+
+    @property
+    def mode(self) -> str:
+        return "inotify" if self._observer is not None else f"polling every {self.poll_seconds:g}s"
+
+    def start(self):
+        for d in self.dirs:
+            d.mkdir(parents=True, exist_ok=True)
+        self.rescan()  # catch up on everything that changed while the worker was down
+
+        if Observer is not None:
+            self._observer = Observer()
+            for d in self.dirs:
+                self._observer.schedule(self, str(d), recursive=True)
+            self._observer.start()
+        else:
+            self._poller = threading.Thread(target=self._poll, name="lake-poller", daemon=True)
+            self._poller.start()
+
+    def wake(self):
+        """Unblock next_batch() and stop polling (safe to call from a signal handler)."""
+        self._stop.set()
+        self._changed.set()
+
+    def stop(self):
+        self.wake()
+        if self._observer is not None:
+            self._observer.stop()
+            self._observer.join()
+
+    def add(self, paths):
+        with self._lock:
+            self._pending.update(paths)
+        self._changed.set()
+
+    def rescan(self):
+        self.add(fp for d in self.dirs for fp in d.rglob("*") if fp.is_file())
+
+    def _poll(self):
+        while not self._stop.wait(self.poll_seconds):
+            self.rescan()
+
+    # watchdog callbacks (scraper writes are atomic renames, so watch moves too)
+    def on_created(self, event):
+        if not event.is_directory:
+            self.add([Path(event.src_path)])
+
+    on_modified = on_created
+
+    def on_moved(self, event):
+        if not event.is_directory:
+            self.add([Path(event.dest_path)])
+
+    def next_batch(self, window: float, timeout: float | None = None) -> set[Path]:
+        """
+        Block until something changed (or `timeout` seconds passed, returning an empty
+        set), keep collecting for `window` seconds, return the paths.
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while not self._changed.is_set():
+            remaining = 1.0 if deadline is None else deadline - time.monotonic()
+            if remaining <= 0:
+                return set()
+            self._changed.wait(min(1.0, remaining))
+        if self._stop.is_set():
+            return set()
+        self._stop.wait(window)
+
+        with self._lock:
+            paths, self._pending = self._pending, set()
+            self._changed.clear()
+        return paths
+
+
+class Worker:
+    def __init__(self):
+        self.stop = threading.Event()
+        self.watcher = LakeWatcher([MESSAGES_DIR, IMAGES_DIR])
+        self.conn = None
+        self.detector = None
+        self.detection_columns: list[str] = []
+        self.processed: dict[str, tuple[int, int]] = {}
+        self.transform_due = False
+        self.last_transform = time.monotonic()
+
+    # ---------- lifecycle ----------
+
+    def start(self):
+        self.db()
+        # Imported lazily: loading ultralytics/torch is the slow part of startup
+        from src.yolo_detect import CSV_COLUMNS, MODEL_NAME, Detector
+        log(f"Loading YOLO model {MODEL_NAME}")
+        self.detector = Detector()
+        self.detection_columns = CSV_COLUMNS
+        self.watcher.start()
+        log(f"Watching {MESSAGES_DIR} and {IMAGES_DIR} ({self.watcher.mode}), "
+            f"{len(self.processed)} files already processed")
+
+    def shutdown(self, *_):
+        """Signal handler: stop after the current batch (see close() for cleanup)."""
+        if not self.stop.is_set():
+            log("Shutdown requested, finishing the current batch")
+        self.stop.set()
+        self.watcher.wake()
+
+    def close(self):
+        self.watcher.stop()
+        if self.detector is not None:
+            self.detector.close()
+        if self.conn is not None:
+            self.conn.close()
+
+    def db(self):
+        """The worker's connection, reconnected if the server dropped it."""
+        if self.conn is None or self.conn.closed:
+            self.conn = connect()
+            self.conn.autocommit = False
+            with self.conn.cursor() as cur:
+                cur.execute(CREATE_STATE_SQL)
+                ensure_table(cur)
+                cur.execute("SELECT path, size, mtime_ns FROM raw.worker_processed_files")
+                self.processed = {p: (size, mtime) for p, size, mtime in cur.fetchall()}
+            self.conn.commit()
+        return self.conn
+
+    # ---------- batching ----------
+
+    def select(self, paths: set[Path]) -> tuple[list, list, list]:
+        """
+        Split changed paths into (message files, images) that need processing, as
+        (path, size, mtime_ns). Unsettled files are returned separately for a retry.
+        """
+        messages, images, unsettled = [], [], []
+        now_ns = time.time_ns()
+        for fp in sorted(paths):
+            suffix = fp.suffix.lower()
+            is_message = suffix in MESSAGE_SUFFIXES and MESSAGES_DIR in fp.parents
+            is_image = suffix in IMAGE_SUFFIXES and IMAGES_DIR in fp.parents
+            if not (is_message or is_image):
+                continue
+            try:
+                st = fp.stat()
+            except FileNotFoundError:
+                continue
+            if self.processed.get(str(fp)) == (st.st_size, st.st_mtime_ns):
+                continue
+            if now_ns - st.st_mtime_ns < WORKER_SETTLE_SECONDS * 1e9:
+                unsettled.append(fp)
+                continue
+            (messages if is_message else images).append((fp, st.st_size, st.st_mtime_ns))
+
+        # A JSON partition whose Parquet copy exists is loaded from the Parquet file
+        parquet = {fp.with_suffix("") for fp, _, _ in messages if fp.suffix == ".parquet"}
+        messages = [m for m in messages if m[0].suffix == ".parquet" or m[0].with_suffix("") not in parquet]
+        return messages, images, unsettled
+
+    def mark(self, cur, done: list[tuple]):
+        """Record processed file versions (same transaction as their rows)."""
+        execute_values(cur, MARK_PROCESSED_SQL, [(str(fp), size, mtime, n) for fp, size, mtime, n in done])
+
+    def load_messages(self, files: list[tuple]) -> int:
+        if not files:
+            return 0
+        conn = self.db()
+        done, total = [], 0
+        try:
+            with conn.cursor() as cur:
+                for fp, size, mtime in files:
+                    try:
+                        batches = list(iter_file_rows(fp))
+                    except Exception as e:  # unreadable Parquet: retried on its next change
+                        log(f"Skipping unreadable {fp}: {e}")
+                        continue
+                    loaded = sum(len(values) for values in batches)
+                    if not loaded and fp.suffix == ".json":
+                        continue  # half-written or corrupt JSON: retried on its next change
+                    for values in batches:
+                        execute_values(cur, INSERT_SQL, values, page_size=2000)
+                    done.append((fp, size, mtime, loaded))
+                    total += loaded
+                if done:
+                    self.mark(cur, done)
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+
+        for fp, size, mtime, _ in done:
+            self.processed[str(fp)] = (size, mtime)
+        log(f"Loaded {total} messages from {len(done)}/{len(files)} lake files")
+        return total
+
+    def detect_images(self, files: list[tuple]) -> int:
+        if not files:
+            return 0
+        self.detector.reload_media_index()
+        run_ts = datetime.now(timezone.utc).isoformat()
+
+        done, rows = [], []
+        for fp, size, mtime in files:
+            if self.stop.is_set():
+                break
+            try:
+                detections = self.detector.detect(fp, run_ts)
+            except Exception as e:  # unreadable/partial image: retried on its next change
+                log(f"Detection failed for {fp}: {e}")
+                continue
+            rows.extend(db_row(dict(zip(self.detection_columns, d))) for d in detections)
+            done.append((fp, size, mtime, len(detections)))
+
+        conn = self.db()
+        try:
+            with conn.cursor() as cur:
+                if rows:
+                    insert_detections(cur, rows)
+                if done:
+                    self.mark(cur, done)
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+
+        for fp, size, mtime, _ in done:
+            self.processed[str(fp)] = (size, mtime)
+        added = self.detector.flush_embeddings()
+        log(f"Detected {len(rows)} objects in {len(done)}/{len(files)} images ({added} new embeddings)")
+        return len(rows)
+
+    def transform(self):
+        # A failed transform stays due and is retried one interval later
+        self.last_transform = time.monotonic()
+        for cmd in TRANSFORM_COMMANDS:
+            if self.stop.is_set():
+                return
+            log(f"Running {' '.join(cmd)}")
+            result = subprocess.run(cmd, capture_output=True, text=True)
+            if result.returncode != 0:
+                log(f"Command failed: {' '.join(cmd)}\n{result.stdout}\n{result.stderr}")
+                return
+        self.transform_due = False
+        self.last_transform = time.monotonic()
+
+    def run_batch(self, paths: set[Path]):
+        messages, images, unsettled = self.select(paths)
+        if unsettled:
+            self.watcher.add(unsettled)
+
+        loaded = self.load_messages(messages)
+        detected = self.detect_images(images)
+        if loaded or detected:
+            self.transform_due = True
+
+    def transform_wait(self) -> float | None:
+        """Seconds until the pending transform is due; None if there is nothing to transform."""
+        if not self.transform_due or WORKER_TRANSFORM_SECONDS <= 0:
+            return None
+        return max(0.0, self.last_transform + WORKER_TRANSFORM_SECONDS - time.monotonic())
+
+    def run(self):
+        self.start()
+        while not self.stop.is_set():
+            # Wake up when the transform comes due even if no more files arrive,
+            # so the last batch still reaches the marts
+            paths = self.watcher.next_batch(WORKER_BATCH_SECONDS, timeout=self.transform_wait())
+            try:
+                if paths:
+                    self.run_batch(paths)
+                if self.transform_wait() == 0 and not self.stop.is_set():
+                    self.transform()
+            except psycopg2.OperationalError as e:
+                # Lost the DB: reconnect on the next batch and retry these files
+                log(f"Database error, retrying: {e}")
+                self.conn = None
+                self.watcher.add(paths)
+                self.stop.wait(WORKER_POLL_SECONDS)
+            except Exception as e:
+                # Keep the daemon alive; the files stay unprocessed and are retried on their next change
+                log(f"Batch failed: {e!r}")
+
+
+def main():
+    worker = Worker()
+    signal.signal(signal.SIGINT, worker.shutdown)
+    signal.signal(signal.SIGTERM, worker.shutdown)
+    try:
+        worker.run()
+    finally:
+        worker.close()
+        log("Worker stopped")
+
+
+if __name__ == "__main__":
+    main()
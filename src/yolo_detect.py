@@ -2,13 +2,17 @@ import os
 import csv
 from pathlib import Path
 from datetime import datetime
+
+import numpy as np
 from ultralytics import YOLO
 
+from src.image_index import EmbeddingStore, update_index
+from src.media import load_index as load_media_index
+
 # Images live here (matches your Task 1 structure)
 IMAGES_DIR = Path("data/raw/images")
-OUT_DIR = Path("data/processed/yolo")
-OUT_DIR.mkdir(parents=True, exist_ok=True)
 
+OUT_DIR = Path("data/processed/yolo")
 OUT_CSV = OUT_DIR / "yolo_detections.csv"
 
 # Use small model for laptops
@@ -17,6 +21,13 @@ MODEL_NAME = os.getenv("YOLO_MODEL", "yolov8n.pt")
 # Confidence threshold
 CONF_THRES = float(os.getenv("YOLO_CONF", "0.25"))
 
+# Inference size (normalized copies are already this size, so no large decode)
+IMGSZ = int(os.getenv("YOLO_IMGSZ", "640"))
+
+# Layer whose pooled output is stored as the image embedding (9 = SPPF, the end of
+# the YOLOv8 backbone); captured during the detection pass, no second forward
+EMBED_LAYER = int(os.getenv("YOLO_EMBED_LAYER", "9"))
+
 
 def infer_message_id(image_path: Path) -> int | None:
     """
@@ -29,6 +40,47 @@ def infer_message_id(image_path: Path) -> int | None:
         return None
 
 
+def detection_source(img_path: Path, channel_name: str, message_id: int, media_index: dict):
+    """
+    Pick the file to run inference on: the detector-ready copy recorded in the
+    media index (src/media.py) if it still exists, else the original.
+    Returns (source_path, (sx, sy)) where sx/sy scale boxes back to original pixels.
+    """
+    entry = media_index.get((channel_name, message_id))
+    detect_path = Path(entry["detect_path"]) if entry and entry.get("detect_path") else None
+
+    if detect_path is None or not detect_path.exists():
+        return img_path, (1.0, 1.0)
+
+    sx = entry["width"] / entry["detect_width"]
+    sy = entry["height"] / entry["detect_height"]
+    return detect_path, (sx, sy)
+
+
+class PooledFeatures:
+    """
+    Forward hook on one model layer that keeps its last output, global-average
+    pooled to a (channels,) vector. Used for image embeddings.
+    """
+
+    def __init__(self, model: YOLO, layer: int):
+        self.value = None
+        self._handle = model.model.model[layer].register_forward_hook(self._hook)
+
+    def _hook(self, module, inputs, output):
+        self.value = output.mean(dim=(2, 3))[0].detach().float().cpu().numpy()
+
+    def pop(self) -> np.ndarray | None:
+        """L2-normalized embedding of the last image (None if the layer did not run)."""
+        v, self.value = self.value, None
+        if v is None:
+            return None
+        return v / (np.linalg.norm(v) + 1e-12)
+
+    def close(self):
+        self._handle.remove()
+
+
 def classify_image(detected_labels: set[str]) -> str:
     """
     Simple categorization scheme:
@@ -53,101 +105,143 @@ def classify_image(detected_labels: set[str]) -> str:
     return "other"
 
 
+CSV_COLUMNS = [
+    "run_ts",
+    "channel_name",
+    "message_id",
+    "image_path",
+    "detected_class",
+    "class_id",
+    "confidence_score",
+    "bbox_x1",
+    "bbox_y1",
+    "bbox_x2",
+    "bbox_y2",
+    "image_category"
+]
+
+
+def detection_rows(boxes, names: dict, scale: tuple[float, float], prefix: list) -> list[list]:
+    """
+    CSV_COLUMNS rows for one image's boxes; prefix = [run_ts, channel_name, message_id, image_path].
+    One row with no class if nothing was found.
+
+    The (n, 6) result tensor (x1, y1, x2, y2, conf, cls) is copied to NumPy once and
+    scaled as a whole; boxes are reported in original-image pixels even when
+    inference ran on the normalized copy (scale = (sx, sy)).
+    """
+    if boxes is None or len(boxes) == 0:
+        return [prefix + [None] * 7 + [classify_image(set())]]
+
+    data = boxes.data.cpu().numpy()
+    sx, sy = scale
+    xyxy = np.round(data[:, :4].astype(np.float64) * (sx, sy, sx, sy), 2)
+    class_ids = data[:, -1].astype(np.int32).tolist()
+    labels = [names.get(c, str(c)) for c in class_ids]
+
+    # Category is the same for all rows of this image
+    image_category = classify_image(set(labels))
+    return [
+        prefix + [label, class_id, conf, x1, y1, x2, y2, image_category]
+        for label, class_id, conf, (x1, y1, x2, y2)
+        in zip(labels, class_ids, data[:, -2].astype(np.float64).tolist(), xyxy.tolist())
+    ]
+
+
+def find_images() -> list[Path]:
+    images = []
+    for ext in ("*.jpg", "*.jpeg", "*.png", "*.webp"):
+        images.extend(IMAGES_DIR.rglob(ext))
+    return images
+
+
+class Detector:
+    """
+    YOLO model, embedding hook and embedding store, loaded once and reused for
+    every image (the batch run below and the long-running src.worker).
+    """
+
+    def __init__(self, model_name: str = MODEL_NAME):
+        self.model_name = model_name
+        self.model = YOLO(model_name)
+        self.features = PooledFeatures(self.model, EMBED_LAYER)
+        self.store = EmbeddingStore()
+        self.media_index = load_media_index()
+
+    def reload_media_index(self):
+        self.media_index = load_media_index()
+
+    def detect(self, img_path: Path, run_ts: str) -> list[list]:
+        """Detection rows (CSV_COLUMNS order) for one image; one row with no class if nothing was found."""
+        channel_name = img_path.parent.name
+        message_id = infer_message_id(img_path)
+
+        if message_id is None:
+            return []
+
+        source_path, scale = detection_source(img_path, channel_name, message_id, self.media_index)
+
+        # Run inference
+        results = self.model.predict(
+            source=str(source_path),
+            conf=CONF_THRES,
+            imgsz=IMGSZ,
+            verbose=False
+        )
+
+        # Embed each image once (the store is append-only and keyed by message)
+        embedding = self.features.pop()
+        if embedding is not None and (channel_name, message_id) not in self.store:
+            self.store.add(channel_name, message_id, str(img_path), embedding,
+                           model=self.model_name, layer=EMBED_LAYER)
+
+        prefix = [run_ts, channel_name, message_id, str(img_path)]
+        return detection_rows(results[0].boxes, self.model.names, scale, prefix)
+
+    def flush_embeddings(self) -> int:
+        """Append buffered embeddings and bring the ANN index up to date. Returns rows added."""
+        added = self.store.flush()
+        if added:
+            update_index(self.store)
+        return added
+
+    def close(self):
+        self.features.close()
+
+
 def main():
     if not IMAGES_DIR.exists():
         print(f"No images folder found at {IMAGES_DIR}. Run Task 1 image download first.")
         return
 
-    images = []
-    for ext in ("*.jpg", "*.jpeg", "*.png", "*.webp"):
-        images.extend(IMAGES_DIR.rglob(ext))
+    images = find_images()
 
     if not images:
         print("No images found to analyze.")
         return
 
     print(f"Found {len(images)} images. Loading model: {MODEL_NAME}")
-    model = YOLO(MODEL_NAME)
+    detector = Detector()
+    print(f"{len(detector.media_index)} images have normalized copies")
+
+    OUT_DIR.mkdir(parents=True, exist_ok=True)
 
     # Write CSV header
     with open(OUT_CSV, "w", newline="", encoding="utf-8") as f:
         writer = csv.writer(f)
-        writer.writerow([
-            "run_ts",
-            "channel_name",
-            "message_id",
-            "image_path",
-            "detected_class",
-            "confidence_score",
-            "bbox_xyxy",
-            "image_category"
-        ])
+        writer.writerow(CSV_COLUMNS)
 
         run_ts = datetime.utcnow().isoformat()
 
         for img_path in images:
-            channel_name = img_path.parent.name
-            message_id = infer_message_id(img_path)
-
-            if message_id is None:
-                continue
-
-            # Run inference
-            results = model.predict(
-                source=str(img_path),
-                conf=CONF_THRES,
-                verbose=False
-            )
-
-            # results is a list, take first
-            r0 = results[0]
-            boxes = r0.boxes
-
-            detected_labels_for_category = set()
-
-            if boxes is None or len(boxes) == 0:
-                # No detections
-                image_category = classify_image(set())
-                writer.writerow([run_ts, channel_name, message_id, str(img_path), None, None, None, image_category])
-                continue
-
-            # Each box: class id, conf, xyxy
-            for b in boxes:
-                cls_id = int(b.cls.item())
-                conf = float(b.conf.item())
-                label = model.names.get(cls_id, str(cls_id))
-                xyxy = b.xyxy.squeeze().tolist()  # [x1,y1,x2,y2]
-                bbox_str = ",".join([f"{x:.2f}" for x in xyxy])
-
-                detected_labels_for_category.add(label)
-
-                # Temporarily write row with placeholder category; update after loop? easiest: compute after
-                # We'll store rows then write after category is known.
-                # For simplicity, write per detection, category computed from full set after loop:
-                # (We can compute category now based on detected_labels_for_category after adding label.)
-                # But category should be same for all rows for this image; so compute after finishing.
-            image_category = classify_image(detected_labels_for_category)
-
-            # Write per detection rows now that category is known
-            for b in boxes:
-                cls_id = int(b.cls.item())
-                conf = float(b.conf.item())
-                label = model.names.get(cls_id, str(cls_id))
-                xyxy = b.xyxy.squeeze().tolist()
-                bbox_str = ",".join([f"{x:.2f}" for x in xyxy])
-
-                writer.writerow([
-                    run_ts,
-                    channel_name,
-                    message_id,
-                    str(img_path),
-                    label,
-                    conf,
-                    bbox_str,
-                    image_category
-                ])
+            writer.writerows(detector.detect(img_path, run_ts))
 
+    detector.close()
+    added = detector.store.flush()
+    index = update_index(detector.store)
     print(f"✅ YOLO detection done. Results saved to: {OUT_CSV}")
+    print(f"✅ Embeddings: {added} new, {len(detector.store)} total in {detector.store.dir} "
+          f"({'flat' if index.is_flat else f'IVF, {len(index.centroids)} lists'})")
 
 
 if __name__ == "__main__":
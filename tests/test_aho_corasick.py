@@ -0,0 +1,45 @@
+import pytest
+
+from src.aho_corasick import Automaton
+from src.extract_products import build_automaton, find_products
+
+DICTIONARY = [
+    ("paracetamol", "paracetamol", "analgesic"),
+    ("panadol", "paracetamol", "analgesic"),
+    ("ፓራሲታሞል", "paracetamol", "analgesic"),
+    ("amoxicillin", "amoxicillin", "antibiotic"),
+    ("amoxicillin clavulanate", "amoxicillin clavulanate", "antibiotic"),
+]
+
+
+def test_iter_matches_reports_overlapping_patterns():
+    ac = Automaton()
+    for word in ("he", "she", "his", "hers"):
+        ac.add(word, word)
+    ac.build()
+
+    found = sorted((start, end, value) for start, end, value in ac.iter_matches("ushers"))
+    assert found == [(1, 4, "she"), (2, 4, "he"), (2, 6, "hers")]
+
+
+def test_automaton_requires_build_and_rejects_late_patterns():
+    ac = Automaton()
+    ac.add("x", 1)
+    with pytest.raises(RuntimeError):
+        list(ac.iter_matches("x"))
+    ac.build()
+    with pytest.raises(RuntimeError):
+        ac.add("y", 2)
+    with pytest.raises(ValueError):
+        Automaton().add("", 1)
+
+
+def test_find_products_counts_synonyms_whole_words_and_longest_match():
+    ac = build_automaton(DICTIONARY)
+    text = "Panadol or PARACETAMOL; paracetamoles no. Amoxicillin Clavulanate and amoxicillin. ፓራሲታሞልን ይግዙ"
+
+    assert find_products(ac, text) == {
+        "paracetamol": ("analgesic", 3),
+        "amoxicillin clavulanate": ("antibiotic", 1),
+        "amoxicillin": ("antibiotic", 1),
+    }
@@ -0,0 +1,131 @@
+import json
+
+import numpy as np
+
+from src.image_index import EmbeddingStore, IVFIndex
+
+DIM = 8
+
+
+def unit_vectors(n, dim=DIM, seed=0):
+    v = np.random.default_rng(seed).normal(size=(n, dim)).astype(np.float32)
+    return v / np.linalg.norm(v, axis=1, keepdims=True)
+
+
+def clustered_unit_vectors(n, dim, clusters=40, seed=0):
+    """Embeddings of images that come in groups (same product, same advert)."""
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(size=(clusters, dim))
+    v = (centers[rng.integers(clusters, size=n)] + 0.5 * rng.normal(size=(n, dim))).astype(np.float32)
+    return v / np.linalg.norm(v, axis=1, keepdims=True)
+
+
+def write_store(directory, n):
+    store = EmbeddingStore(directory)
+    vectors = unit_vectors(n)
+    for i in range(n):
+        store.add("chan", i, f"img/{i}.jpg", vectors[i], model="test", layer=9)
+    store.flush()
+    return vectors
+
+
+def snapshot(directory):
+    return {p.name: p.read_bytes() for p in directory.iterdir()}
+
+
+def test_read_only_store_during_partial_flush(tmp_path):
+    vectors = write_store(tmp_path, 3)
+
+    # A writer mid-flush of rows 3..5: all vectors appended, key 3 complete,
+    # key 4 half written, key 5 not yet
+    extra = unit_vectors(3, seed=1)
+    with open(tmp_path / "vectors.f16", "ab") as f:
+        f.write(extra.astype(np.float16).tobytes())
+    key3 = json.dumps({"channel_name": "chan", "message_id": 3, "image_path": "img/3.jpg"}) + "\n"
+    key4 = json.dumps({"channel_name": "chan", "message_id": 4, "image_path": "img/4.jpg"})
+    with open(tmp_path / "keys.jsonl", "a", encoding="utf-8") as f:
+        f.write(key3 + key4[:20])
+    before = snapshot(tmp_path)
+
+    reader = EmbeddingStore(tmp_path, read_only=True)
+
+    assert snapshot(tmp_path) == before
+    assert len(reader) == 4
+    assert reader.rows_by_key[("chan", 3)] == 3
+    assert ("chan", 4) not in reader
+    np.testing.assert_allclose(reader.vectors()[3], extra[0], atol=1e-3)
+    np.testing.assert_allclose(reader.vectors()[:3], vectors, atol=1e-3)
+
+    # The writer finishes; a reader opened afterwards sees every row in place
+    with open(tmp_path / "keys.jsonl", "a", encoding="utf-8") as f:
+        f.write(key4[20:] + "\n")
+        f.write(json.dumps({"channel_name": "chan", "message_id": 5, "image_path": "img/5.jpg"}) + "\n")
+
+    reader = EmbeddingStore(tmp_path, read_only=True)
+    assert len(reader) == 6
+    assert reader.rows_by_key[("chan", 5)] == 5
+    np.testing.assert_allclose(reader.vectors()[5], extra[2], atol=1e-3)
+
+
+def test_writer_repairs_interrupted_append(tmp_path):
+    write_store(tmp_path, 3)
+    with open(tmp_path / "vectors.f16", "ab") as f:
+        f.write(unit_vectors(2, seed=1).astype(np.float16).tobytes())
+    with open(tmp_path / "keys.jsonl", "a", encoding="utf-8") as f:
+        f.write('{"channel_name": "chan", "mess')
+
+    writer = EmbeddingStore(tmp_path)
+    assert len(writer) == 3
+    assert (tmp_path / "vectors.f16").stat().st_size == 3 * DIM * 2
+    assert (tmp_path / "keys.jsonl").read_text(encoding="utf-8").endswith("\n")
+
+    new = unit_vectors(1, seed=2)[0]
+    writer.add("chan", 7, "img/7.jpg", new)
+    writer.flush()
+
+    reader = EmbeddingStore(tmp_path, read_only=True)
+    assert len(reader) == 4
+    assert reader.rows_by_key[("chan", 7)] == 3
+    np.testing.assert_allclose(reader.vectors()[3], new, atol=1e-3)
+
+
+def test_flush_appends_after_rows_of_another_writer(tmp_path):
+    write_store(tmp_path, 2)
+    a = EmbeddingStore(tmp_path)
+    b = EmbeddingStore(tmp_path)
+
+    va, vb = unit_vectors(2, seed=3)
+    a.add("chan", 10, "img/10.jpg", va)
+    a.flush()
+    b.add("chan", 11, "img/11.jpg", vb)
+    b.flush()
+
+    assert b.rows_by_key[("chan", 11)] == 3
+    reader = EmbeddingStore(tmp_path, read_only=True)
+    np.testing.assert_allclose(reader.vectors()[reader.rows_by_key[("chan", 10)]], va, atol=1e-3)
+    np.testing.assert_allclose(reader.vectors()[reader.rows_by_key[("chan", 11)]], vb, atol=1e-3)
+
+
+def test_ivf_search_recall_against_exact():
+    vectors = clustered_unit_vectors(6000, dim=32)
+    index = IVFIndex.train(vectors, nlist=32)
+    assert not index.is_flat
+
+    hits = 0
+    for q in range(50):
+        exact = np.argsort(-(vectors @ vectors[q]))[:10]
+        rows, scores = index.search(vectors, vectors[q], 10, nprobe=8)
+        assert rows[0] == q
+        assert np.all(np.diff(scores) <= 1e-6)
+        hits += len(set(rows.tolist()) & set(exact.tolist()))
+    assert hits / 500 >= 0.9
+
+
+def test_ivf_add_indexes_new_rows_only():
+    vectors = unit_vectors(6000, dim=16)
+    index = IVFIndex.train(vectors[:5000], nlist=16)
+    index.add(vectors)
+
+    assert len(index) == 6000
+    rows, _ = index.search(vectors, vectors[5500], 1, nprobe=1)
+    assert rows.tolist() == [5500]
@@ -0,0 +1,90 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from api.load_control import EndpointGuard, Overloaded
+
+
+def test_identical_concurrent_calls_share_one_execution():
+    guard = EndpointGuard("test", max_concurrent=2, max_queue=0)
+    release = threading.Event()
+    calls = []
+
+    def query():
+        calls.append(1)
+        release.wait(5)
+        return ["row"]
+
+    with ThreadPoolExecutor(max_workers=20) as pool:
+        futures = [pool.submit(guard.run, ("same",), query) for _ in range(20)]
+        while guard.stats["requests"] < 20:
+            time.sleep(0.01)
+        release.set()
+        results = [f.result() for f in futures]
+
+    assert results == [["row"]] * 20
+    assert len(calls) == 1
+    assert guard.stats["executions"] == 1
+    assert guard.stats["coalesced"] == 19
+    assert guard.snapshot()["inflight"] == 0
+
+
+def test_followers_receive_the_leaders_exception():
+    guard = EndpointGuard("test", max_concurrent=1, max_queue=0)
+    release = threading.Event()
+
+    def failing():
+        release.wait(5)
+        raise ValueError("boom")
+
+    with ThreadPoolExecutor(max_workers=5) as pool:
+        futures = [pool.submit(guard.run, ("k",), failing) for _ in range(5)]
+        while guard.stats["requests"] < 5:
+            time.sleep(0.01)
+        release.set()
+        for f in futures:
+            with pytest.raises(ValueError):
+                f.result()
+    assert guard.stats["executions"] == 1
+
+
+def test_distinct_calls_beyond_limit_and_queue_are_shed():
+    guard = EndpointGuard("test", max_concurrent=1, max_queue=1, queue_timeout=5)
+    release = threading.Event()
+
+    def slow():
+        release.wait(5)
+        return 1
+
+    with ThreadPoolExecutor(max_workers=3) as pool:
+        running = pool.submit(guard.run, ("a",), slow)
+        while guard.stats["executions"] < 1:
+            time.sleep(0.01)
+        queued = pool.submit(guard.run, ("b",), slow)
+        while guard.snapshot()["waiting"] < 1:
+            time.sleep(0.01)
+
+        with pytest.raises(Overloaded) as exc:
+            guard.run(("c",), slow)
+        assert exc.value.retry_after > 0
+
+        release.set()
+        assert running.result() == 1 and queued.result() == 1
+    assert guard.stats["shed"] == 1
+
+
+def test_queued_call_times_out():
+    guard = EndpointGuard("test", max_concurrent=1, max_queue=1, queue_timeout=0.05)
+    release = threading.Event()
+
+    with ThreadPoolExecutor(max_workers=1) as pool:
+        running = pool.submit(guard.run, ("a",), lambda: release.wait(5))
+        while guard.stats["executions"] < 1:
+            time.sleep(0.01)
+        with pytest.raises(Overloaded):
+            guard.run(("b",), lambda: 1)
+        release.set()
+        running.result()
+    assert guard.stats["timeouts"] == 1
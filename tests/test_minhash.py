@@ -0,0 +1,42 @@
+import itertools
+
+from src.minhash import LSHIndex, MinHasher, normalize_text, similarity
+
+AD = "Paracetamol 500mg and Amoxicillin Clavulanate now available, call us for delivery in Addis"
+
+
+def test_normalize_text_drops_links_handles_and_punctuation():
+    text = "Call @chemed_pharma NOW!!! https://t.me/chemed 💊 Paracetamol, 500mg"
+    assert normalize_text(text) == "call now paracetamol 500mg"
+
+
+def test_signature_is_deterministic_and_short_text_has_none():
+    a, b = MinHasher(seed=1), MinHasher(seed=1)
+    assert (a.signature(normalize_text(AD)) == b.signature(normalize_text(AD))).all()
+    assert a.signature("abc") is None
+
+
+def test_similarity_tracks_near_duplicates():
+    mh = MinHasher()
+    base = mh.signature(normalize_text(AD))
+    repost = mh.signature(normalize_text(AD + " 🔥 @chemed"))
+    other = mh.signature(normalize_text("Vitamin C serum and sunscreen cream, new stock arrived this week"))
+
+    assert similarity(base, repost) == 1.0
+    assert similarity(base, other) < 0.2
+
+
+def test_lsh_clusters_reposts_and_separates_other_text():
+    mh = MinHasher()
+    lsh = LSHIndex(bands=16, rows=8, threshold=0.8)
+    ids = itertools.count(1)
+
+    def cluster(text):
+        sig = mh.signature(normalize_text(text))
+        return lsh.assign(sig, lsh.band_keys(sig), lambda: next(ids))
+
+    first = cluster(AD)
+    assert cluster(AD.upper() + "!!") == first
+    assert cluster(AD + " today") == first
+    assert cluster("Vitamin C serum and sunscreen cream, new stock arrived this week") != first
+    assert len(lsh.new_clusters) == 2